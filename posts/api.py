@@ -0,0 +1,159 @@
+"""JSON API для лент и записей (только чтение), /api/v1/.
+
+Ленты берут те же выборки, что и HTML-страницы, и так же делятся
+на страницы (?page= или ?cursor=). Ответы поддерживают условные
+запросы: ETag строится по составу страницы (id, версия и число
+комментариев каждой записи), Last-Modified - по самому свежему
+Post.updated на ней (его двигают правка, новый и удалённый
+комментарий) и по времени изменения областей ленты из
+posts/freshness.py: удаление записи меняет состав страницы, не
+затрагивая оставшиеся записи. У ленты подписок своей области нет,
+она отдаёт только ETag. Если клиент прислал актуальные If-None-Match
+или If-Modified-Since, отвечаем 304 без сериализации.
+"""
+import hashlib
+
+from django.contrib.auth.models import User
+from django.core.exceptions import PermissionDenied
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.http import urlencode
+from django.views.decorators.http import condition, require_safe
+
+from . import freshness, timeline
+from .models import Post, Group
+from .paginator import paginate
+
+# Меняется вместе с форматом ответа, чтобы старые ETag не совпали
+API_VERSION = 1
+
+
+def post_data(post):
+    return {'id': post.pk,
+            'text': post.text,
+            'pub_date': post.pub_date,
+            'author': post.author.username,
+            'group': post.group.slug if post.group_id else None,
+            'image': post.image.url if post.image else None,
+            'comment_count': post.comment_count}
+
+
+def signature(*parts):
+    return hashlib.md5(repr((API_VERSION,) + parts).encode()).hexdigest()
+
+
+class FeedState:
+    """Страница ленты и её ETag / Last-Modified, считаются один раз на запрос."""
+
+    def __init__(self, request, post_list, scopes=None):
+        self.paginator, self.page = paginate(request, post_list)
+        self.posts = list(self.page)
+        self.etag = signature(request.get_full_path(),
+                              [(post.pk, post.version, post.comment_count) for post in self.posts])
+        self.last_modified = None
+        if scopes is not None:
+            stamps = freshness.stamps([freshness.SITE, *scopes])
+            if freshness.settled(stamps):
+                changed = [stamp.changed for stamp in stamps]
+                changed.extend(post.updated.timestamp() for post in self.posts)
+                self.last_modified = freshness.http_last_modified(max(changed))
+
+    def links(self, request):
+        page = self.page
+        if getattr(page, 'is_cursor', False):
+            next_query = page.next_cursor and {'cursor': page.next_cursor}
+            previous_query = page.previous_cursor and {'cursor': page.previous_cursor}
+        else:
+            next_query = page.has_next() and {'page': page.next_page_number()}
+            previous_query = page.has_previous() and {'page': page.previous_page_number()}
+        return {'next': f'{request.path}?{urlencode(next_query)}' if next_query else None,
+                'previous': f'{request.path}?{urlencode(previous_query)}' if previous_query else None}
+
+
+def feed_view(get_scopes=None):
+    """Делает API-представление ленты из функции, выбирающей записи.
+
+    get_scopes(**kwargs) - области ленты для Last-Modified, как
+    у freshness.conditional_page; без них отдаётся только ETag.
+    """
+    def decorator(get_posts):
+        def state(request, *args, **kwargs):
+            # condition() вызывает etag и last_modified до самого представления
+            if not hasattr(request, 'api_feed'):
+                scopes = get_scopes(*args, **kwargs) if get_scopes else None
+                request.api_feed = FeedState(request, get_posts(request, *args, **kwargs), scopes)
+            return request.api_feed
+
+        def etag(request, *args, **kwargs):
+            return state(request, *args, **kwargs).etag
+
+        def last_modified(request, *args, **kwargs):
+            return state(request, *args, **kwargs).last_modified
+
+        @require_safe
+        @condition(etag_func=etag, last_modified_func=last_modified)
+        def view(request, *args, **kwargs):
+            feed = state(request, *args, **kwargs)
+            data = {'results': [post_data(post) for post in feed.posts], **feed.links(request)}
+            if not getattr(feed.page, 'is_cursor', False):
+                data['count'] = feed.paginator.count
+            return JsonResponse(data, json_dumps_params={'ensure_ascii': False})
+
+        view.__name__ = get_posts.__name__
+        return view
+    return decorator
+
+
+@feed_view(lambda: [freshness.INDEX])
+def index(request):
+    return Post.objects.for_feed()
+
+
+@feed_view(lambda slug: [freshness.group(slug)])
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return group.posts.for_feed()
+
+
+@feed_view(lambda username: [freshness.profile(username)])
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return author.posts.for_feed()
+
+
+@feed_view()
+def follow_index(request):
+    if not request.user.is_authenticated:
+        raise PermissionDenied
+    return timeline.follow_feed(request.user)
+
+
+def get_post(request, post_id):
+    if not hasattr(request, 'api_post'):
+        post = get_object_or_404(Post.objects.for_feed(), pk=post_id)
+        # post.version и post.updated меняются с каждым комментарием и правкой записи
+        post.etag = signature(post.pk, post.version, post.comment_count)
+        post.last_modified = freshness.http_last_modified(post.updated.timestamp())
+        request.api_post = post
+    return request.api_post
+
+
+def post_etag(request, post_id):
+    return get_post(request, post_id).etag
+
+
+def post_last_modified(request, post_id):
+    return get_post(request, post_id).last_modified
+
+
+@require_safe
+@condition(etag_func=post_etag, last_modified_func=post_last_modified)
+def post_view(request, post_id):
+    post = get_post(request, post_id)
+    comments = post.сomments.select_related('author')
+    data = {**post_data(post),
+            'comments': [{'id': comment.pk,
+                          'author': comment.author.username,
+                          'text': comment.text,
+                          'created': comment.created} for comment in comments]}
+    return JsonResponse(data, json_dumps_params={'ensure_ascii': False})
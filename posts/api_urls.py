@@ -0,0 +1,8 @@
+from django.urls import path
+from . import api
+
+urlpatterns = [path('posts/', api.index, name='api_index'),
+               path('posts/<int:post_id>/', api.post_view, name='api_post'),
+               path('group/<slug:slug>/', api.group_posts, name='api_group_posts'),
+               path('follow/', api.follow_index, name='api_follow_index'),
+               path('users/<str:username>/', api.profile, name='api_profile')]
@@ -0,0 +1,131 @@
+"""Заполнение данных порциями, которое можно прервать и продолжить.
+
+Миграция с RunPython выполняется одной транзакцией и держит SQLite
+заблокированной, пока не пройдёт по всей таблице. Здесь строки
+обходятся по первичному ключу порциями по batch_size, каждая порция
+фиксируется своей транзакцией вместе с отметкой BackfillState.last_pk,
+а между порциями можно делать паузу, чтобы не мешать сайту.
+
+Новое заполнение - подкласс Backfill с методом process(pks),
+зарегистрированный декоратором register. Запуск:
+
+    python manage.py backfill comment_count --batch-size 500 --sleep 0.1
+"""
+import time
+
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import freshness, images, thumbnails
+from .models import Post, Comment, ThumbnailTask, BackfillState
+
+BACKFILLS = {}
+
+
+def register(cls):
+    BACKFILLS[cls.name] = cls
+    return cls
+
+
+class Backfill:
+    name = None
+    model = None
+
+    def queryset(self):
+        return self.model.objects.all()
+
+    def process(self, pks):
+        """Обрабатывает одну порцию строк с первичными ключами pks."""
+        raise NotImplementedError
+
+
+def run(backfill, batch_size=500, sleep=0, max_batches=None, report=None):
+    """Продолжает заполнение с сохранённой отметки.
+
+    Возвращает True, если строки закончились, и False, если
+    остановились по max_batches. report(state, rate) вызывается
+    после каждой порции.
+    """
+    state, _ = BackfillState.objects.get_or_create(name=backfill.name)
+    pks = backfill.queryset().order_by('pk').values_list('pk', flat=True)
+    started = time.perf_counter()
+    done = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            chunk = list(pks.filter(pk__gt=state.last_pk)[:batch_size])
+            if not chunk:
+                state.finished = timezone.now()
+                state.save()
+                return True
+            backfill.process(chunk)
+            # отметка фиксируется вместе с данными порции
+            state.last_pk = chunk[-1]
+            state.rows += len(chunk)
+            state.finished = None
+            state.save()
+        batches += 1
+        done += len(chunk)
+        if report is not None:
+            report(state, done / (time.perf_counter() - started))
+        if sleep:
+            time.sleep(sleep)
+    return False
+
+
+def reset(backfill):
+    BackfillState.objects.filter(name=backfill.name).delete()
+
+
+@register
+class CommentCountBackfill(Backfill):
+    """Пересчитывает Post.comment_count по таблице комментариев."""
+    name = 'comment_count'
+    model = Post
+
+    def process(self, pks):
+        comments = (Comment.objects.filter(post=OuterRef('pk'))
+                    .order_by().values('post').annotate(total=Count('pk')).values('total'))
+        actual = Coalesce(Subquery(comments, output_field=IntegerField()), 0)
+        if Post.objects.filter(pk__in=pks).exclude(comment_count=actual).update(comment_count=actual):
+            freshness.touch(freshness.SITE)
+
+
+@register
+class ThumbnailBackfill(Backfill):
+    """Ставит в очередь ThumbnailTask записи, у которых нет миниатюр."""
+    name = 'thumbnails'
+    model = Post
+
+    def queryset(self):
+        return Post.objects.exclude(image='').exclude(image=None)
+
+    def process(self, pks):
+        posts = Post.objects.filter(pk__in=pks).only('image')
+        ThumbnailTask.objects.bulk_create(
+            [ThumbnailTask(post=post, image=post.image.name)
+             for post in posts if not thumbnails.is_built(post.image)],
+            ignore_conflicts=True)
+
+
+@register
+class ImageDimensionsBackfill(Backfill):
+    """Записывает размеры картинок, загруженных до posts/images.py."""
+    name = 'image_dimensions'
+    model = Post
+
+    def queryset(self):
+        return Post.objects.exclude(image='').exclude(image=None).filter(image_width=None)
+
+    def process(self, pks):
+        posts = []
+        for post in Post.objects.filter(pk__in=pks).only('image'):
+            try:
+                post.image_width, post.image_height = images.dimensions(post.image)
+            except (OSError, ValueError):
+                # файл потерян или не читается - оставляем размеры пустыми
+                continue
+            posts.append(post)
+        Post.objects.bulk_update(posts, ['image_width', 'image_height'])
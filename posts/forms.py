@@ -1,10 +1,27 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 from django.utils.translation import gettext_lazy as _
 
+from . import images
 from .models import Post, Comment
 
 
 class PostForm(forms.ModelForm):
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        # новая загрузка; иначе это уже сохранённый файл или очистка поля
+        if isinstance(image, UploadedFile):
+            image, width, height = images.ingest(image)
+            self.image_size = (width, height)
+        elif not image:
+            self.image_size = (None, None)
+        return image
+
+    def save(self, commit=True):
+        if hasattr(self, 'image_size'):
+            self.instance.image_width, self.instance.image_height = self.image_size
+        return super().save(commit)
+
     class Meta:
         model = Post
         fields = ('group', 'text', 'image')
@@ -0,0 +1,190 @@
+"""Условные ответы (ETag / Last-Modified) для HTML-страниц лент.
+
+Каждой области сайта соответствует строка ScopeVersion с номером
+версии и временем последнего изменения: 'index', 'group:<slug>',
+'profile:<username>', 'post:<id>' и общая 'site' (переименование
+автора, правка группы). Сигналы из posts/signals.py увеличивают
+версии в той же транзакции, что и саму запись, а страница по ним
+одним запросом узнаёт, изменилась ли она, и отвечает 304, не рисуя
+шаблон.
+
+Версии лежат в базе, а не в кэше: кэш по умолчанию свой у каждого
+воркера, и запись в одном процессе не была бы видна в остальных.
+ETag и ключи кэша строятся из номеров версий (две записи в одну
+секунду дают разные ETag) вместе со временем изменения - оно не даёт
+совпасть ключам, если база откатится к прежним версиям. Last-Modified точен только до секунды и отдаётся,
+лишь когда секунда последнего изменения уже прошла.
+
+Готовые страницы для анонимных пользователей лежат в кэше, под
+ключом из пути с параметрами и отметок страницы. Изменение записи
+увеличивает версии только затронутых областей, и устаревшими
+становятся ровно страницы этих областей, остальные остаются в кэше.
+"""
+import functools
+import hashlib
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils import timezone as django_timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from yatube import db_router
+
+from .models import Post, ScopeVersion
+
+SITE = 'site'
+INDEX = 'index'
+
+KEY_PREFIX = 'stamp:'
+PAGE_PREFIX = 'page:'
+
+
+def group(slug):
+    return f'group:{slug}'
+
+
+def profile(username):
+    return f'profile:{username}'
+
+
+def post(post_id):
+    return f'post:{post_id}'
+
+
+Stamp = namedtuple('Stamp', 'version changed')
+# область, в которой ещё ничего не менялось
+NEVER = Stamp(0, 0.0)
+
+
+def stamps(scopes):
+    """Версия и время изменения (timestamp) каждой из областей scopes."""
+    found = {scope: Stamp(version, changed.timestamp()) for scope, version, changed
+             in ScopeVersion.objects.filter(scope__in=scopes).values_list('scope', 'version', 'changed')}
+    return [found.get(scope, NEVER) for scope in scopes]
+
+
+def touch(*scopes):
+    scopes = set(scopes)
+    if not scopes:
+        return
+    now = django_timezone.now()
+    ScopeVersion.objects.bulk_create(
+        [ScopeVersion(scope=scope, changed=now) for scope in scopes], ignore_conflicts=True)
+    ScopeVersion.objects.filter(scope__in=scopes).update(version=F('version') + 1, changed=now)
+
+
+def settled(page_stamps):
+    """Последнее изменение уже видно на реплике, страницу можно кэшировать.
+
+    Иначе страница могла быть прочитана с отстающей реплики, и под
+    новыми версиями в кэш попало бы старое содержимое.
+    """
+    return not db_router.recently_changed(max(stamp.changed for stamp in page_stamps))
+
+
+def post_scopes(post_id):
+    """Области, на страницах которых видна карточка записи post_id."""
+    row = (Post.objects.filter(pk=post_id)
+           .values_list('author__username', 'group__slug').first())
+    if row is None:
+        return [INDEX, post(post_id)]
+    username, slug = row
+    scopes = [INDEX, profile(username), post(post_id)]
+    if slug:
+        scopes.append(group(slug))
+    return scopes
+
+
+def page_stamps(request, get_scopes, kwargs):
+    # версии читаются один раз за запрос, их используют и ETag, и кэш
+    if not hasattr(request, 'page_stamps'):
+        request.page_stamps = stamps([SITE, *get_scopes(**kwargs)])
+    return request.page_stamps
+
+
+def page_etag(request, page_stamps):
+    if not settled(page_stamps):
+        return None
+    key = (tuple(page_stamps), request.get_full_path(), request.user.pk)
+    if request.user.is_authenticated:
+        # в формах страницы CSRF-токен, а вход в систему его меняет
+        key += (request.META.get('CSRF_COOKIE'),)
+    return hashlib.md5(repr(key).encode()).hexdigest()
+
+
+def http_last_modified(timestamp):
+    """Значение Last-Modified (до секунды) или None, пока секунда не прошла.
+
+    Пока идёт секунда последнего изменения, в неё может попасть
+    ещё одно, и If-Modified-Since его бы не заметил.
+    """
+    second = int(timestamp)
+    if not second or int(time.time()) <= second:
+        return None
+    return datetime.fromtimestamp(second, timezone.utc)
+
+
+def page_last_modified(request, page_stamps):
+    # дата не отличит страницу со старым CSRF-токеном, вошедшим - только ETag
+    if request.user.is_authenticated or not settled(page_stamps):
+        return None
+    return http_last_modified(max(stamp.changed for stamp in page_stamps))
+
+
+def cached_page(view, request, page_stamps, kwargs):
+    """Страница для анонимного пользователя из кэша или свежая."""
+    if request.method != 'GET' or request.user.is_authenticated:
+        return view(request, **kwargs)
+    key = PAGE_PREFIX + hashlib.md5(
+        repr((tuple(page_stamps), request.get_full_path())).encode()).hexdigest()
+    cached = cache.get(key)
+    if cached is not None:
+        content, content_type = cached
+        return HttpResponse(content, content_type=content_type)
+    response = view(request, **kwargs)
+    if response.status_code == 200 and not response.streaming and settled(page_stamps):
+        cache.set(key, (response.content, response['Content-Type']), settings.PAGE_CACHE_TIMEOUT)
+    return response
+
+
+def patch_page_cache_control(request, response):
+    if request.user.is_authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, public=True, max_age=0,
+                            s_maxage=settings.FEED_PROXY_MAX_AGE)
+
+
+def conditional_page(get_scopes):
+    """Декоратор HTML-страницы, которая зависит от областей get_scopes(**kwargs).
+
+    Отвечает 304 на повторный запрос, анонимным пользователям отдаёт
+    страницу из кэша, если ни одна из её областей не менялась.
+
+    ETag учитывает версии, полный путь с параметрами и пользователя
+    (у вошедшего другая навигация и кнопки), а для вошедшего ещё
+    и CSRF-токен его форм. Анонимные страницы
+    помечаются public, чтобы их мог отдавать обратный прокси.
+    """
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=lambda request, **kwargs: page_etag(
+                request, page_stamps(request, get_scopes, kwargs)),
+            last_modified_func=lambda request, **kwargs: page_last_modified(
+                request, page_stamps(request, get_scopes, kwargs)),
+        )(lambda request, **kwargs: cached_page(
+            view, request, page_stamps(request, get_scopes, kwargs), kwargs))
+
+        @functools.wraps(view)
+        def wrapper(request, **kwargs):
+            response = conditional_view(request, **kwargs)
+            patch_page_cache_control(request, response)
+            return response
+        return wrapper
+    return decorator
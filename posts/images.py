@@ -0,0 +1,55 @@
+"""Обработка загруженных картинок перед сохранением.
+
+Фотографии с телефона весят мегабайты, а sorl при каждой новой
+миниатюре читает оригинал целиком. Поэтому PostForm ещё до
+сохранения записи уменьшает картинку до MAX_SIDE по большей стороне,
+поворачивает её по EXIF и пересохраняет без метаданных: непрозрачные
+картинки - в JPEG с качеством QUALITY, с прозрачностью - в PNG.
+Анимированные GIF сохраняются как есть, иначе пропала бы анимация.
+Размеры готовой картинки записываются в Post.image_width/image_height.
+"""
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+MAX_SIDE = 2048
+QUALITY = 85
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def ingest(upload):
+    """Возвращает (файл для сохранения, ширина, высота)."""
+    upload.seek(0)
+    image = Image.open(upload)
+    if getattr(image, 'is_animated', False):
+        upload.seek(0)
+        return upload, image.width, image.height
+    icc_profile = image.info.get('icc_profile')
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((MAX_SIDE, MAX_SIDE), Image.LANCZOS)
+
+    output = BytesIO()
+    if has_alpha(image):
+        image = image.convert('RGBA')
+        image.save(output, 'PNG', optimize=True)
+        extension = '.png'
+    else:
+        image = image.convert('RGB')
+        # EXIF не передаём - геотег и прочие метаданные не сохраняются,
+        # цветовой профиль оставляем, чтобы не поменялись цвета
+        image.save(output, 'JPEG', quality=QUALITY, optimize=True, progressive=True,
+                   icc_profile=icc_profile)
+        extension = '.jpg'
+    name = os.path.splitext(os.path.basename(upload.name))[0] + extension
+    return ContentFile(output.getvalue(), name=name), image.width, image.height
+
+
+def dimensions(field_file):
+    """Размеры уже сохранённой картинки; файл читается только до заголовка."""
+    with field_file.storage.open(field_file.name) as source:
+        return Image.open(source).size
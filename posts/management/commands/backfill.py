@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from posts import backfill
+
+
+class Command(BaseCommand):
+    help = ('Заполняет данные порциями по первичному ключу, '
+            'каждую порцию своей транзакцией. После прерывания '
+            'продолжает с последней сохранённой порции.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(backfill.BACKFILLS))
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--sleep', type=float, default=0,
+                            help='пауза в секундах между порциями')
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help='остановиться после стольких порций')
+        parser.add_argument('--restart', action='store_true',
+                            help='начать с начала таблицы')
+
+    def handle(self, *args, **options):
+        job = backfill.BACKFILLS[options['name']]()
+        if options['restart']:
+            backfill.reset(job)
+        finished = backfill.run(job,
+                                batch_size=options['batch_size'],
+                                sleep=options['sleep'],
+                                max_batches=options['max_batches'],
+                                report=self.report)
+        if finished:
+            self.stdout.write(self.style.SUCCESS(f'{job.name}: готово'))
+        else:
+            self.stdout.write(f'{job.name}: остановлено, следующий запуск продолжит')
+
+    def report(self, state, rate):
+        self.stdout.write(f'{state.name}: строк {state.rows}, '
+                          f'последний id {state.last_pk}, {rate:.0f} строк/с')
@@ -0,0 +1,77 @@
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+# Конфигурации для сравнения: как было в settings.py и как стало
+CONFIGS = {
+    'sqlite3': {'ENGINE': 'django.db.backends.sqlite3', 'CONN_MAX_AGE': 0, 'OPTIONS': {}},
+    'tuned': {'ENGINE': 'yatube.sqlite_backend', 'CONN_MAX_AGE': 60, 'OPTIONS': {'timeout': 20}},
+}
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает параллельную запись в SQLite через обычный бэкенд '
+            'sqlite3 и через yatube.sqlite_backend. Каждый поток имитирует '
+            'запросы new_post/add_comment: транзакция с чтением и записью, '
+            'затем соединение закрывается, если его не разрешено держать. '
+            'Работает с временными файлами, рабочую базу не трогает.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--writes', type=int, default=200,
+                            help='транзакций записи на поток')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"бэкенд":<10}{"записей/с":>12}{"ошибок":>10}{"мс (ср / p95)":>18}')
+        with tempfile.TemporaryDirectory() as directory:
+            for name, config in CONFIGS.items():
+                alias = f'bench_{name}'
+                connections.databases[alias] = {**config, 'NAME': os.path.join(directory, f'{name}.sqlite3')}
+                connections.ensure_defaults(alias)
+                connections.prepare_test_settings(alias)
+                try:
+                    self.run(alias, options)
+                finally:
+                    connections[alias].close()
+                    del connections.databases[alias]
+
+    def run(self, alias, options):
+        with connections[alias].cursor() as cursor:
+            cursor.execute('CREATE TABLE bench_post (id INTEGER PRIMARY KEY, author INTEGER, text TEXT)')
+        timings = []
+        errors = []
+        workers = [threading.Thread(target=self.write, args=(alias, number, options['writes'], timings, errors))
+                   for number in range(options['threads'])]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        latency = (f'{statistics.mean(timings) * 1000:.1f} / '
+                   f'{sorted(timings)[int(len(timings) * 0.95)] * 1000:.1f}' if timings else '-')
+        self.stdout.write(f'{alias[6:]:<10}{len(timings) / elapsed:>12.0f}{len(errors):>10}{latency:>18}')
+
+    def write(self, alias, author, writes, timings, errors):
+        connection = connections[alias]
+        try:
+            for i in range(writes):
+                started = time.perf_counter()
+                try:
+                    # как в представлении: сначала чтение, потом запись
+                    with transaction.atomic(using=alias), connection.cursor() as cursor:
+                        cursor.execute('SELECT COUNT(*) FROM bench_post WHERE author = %s', [author])
+                        cursor.execute('INSERT INTO bench_post (author, text) VALUES (%s, %s)',
+                                       [author, f'запись {i}'])
+                    timings.append(time.perf_counter() - started)
+                except OperationalError:
+                    errors.append(author)
+                # конец запроса: Django закрывает соединение по CONN_MAX_AGE
+                connection.close_if_unusable_or_obsolete()
+        finally:
+            connection.close()
@@ -0,0 +1,110 @@
+import random
+import statistics
+import time
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from posts import timeline
+from posts.models import Post, Follow, TimelineEntry
+
+User = get_user_model()
+
+STRATEGIES = (timeline.JOIN, timeline.FANOUT, timeline.HYBRID)
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает стоимость публикации и чтения ленты подписок '
+            'для стратегий join, fanout и hybrid. Все данные создаются '
+            'в транзакции и откатываются, но запускать лучше на копии базы.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--follows', type=int, default=50,
+                            help='подписок на одного пользователя')
+        parser.add_argument('--posts', type=int, default=5,
+                            help='записей у каждого автора до замера')
+        parser.add_argument('--writes', type=int, default=200)
+        parser.add_argument('--reads', type=int, default=200)
+        parser.add_argument('--celebrity-followers', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        self.options = options
+        for distribution in ('uniform', 'skewed'):
+            with transaction.atomic():
+                self.run_distribution(distribution)
+                transaction.set_rollback(True)
+
+    def run_distribution(self, distribution):
+        rnd = random.Random(self.options['seed'])
+        users = self.create_users()
+        popularity = self.create_follows(rnd, users, distribution)
+        Post.objects.bulk_create(
+            Post(text=f'bench {i}', author_id=author_id)
+            for author_id in users for i in range(self.options['posts']))
+        # bulk_create не вызывает сигналы, а hybrid выбирает знаменитостей
+        # по AuthorStats.followers_count - заполняем счётчики по таблицам
+        call_command('reconcile_stats', stdout=StringIO())
+
+        self.stdout.write(f'\n{distribution}: пользователей {len(users)}, '
+                          f'подписок {sum(popularity.values())}, '
+                          f'максимум подписчиков у автора {max(popularity.values())}')
+        self.stdout.write(f'{"стратегия":<10}{"запись, мс (ср / p95)":>26}{"чтение, мс (ср / p95)":>26}')
+
+        for strategy in STRATEGIES:
+            with override_settings(FOLLOW_FEED_STRATEGY=strategy,
+                                   FOLLOW_FEED_CELEBRITY_FOLLOWERS=self.options['celebrity_followers']):
+                TimelineEntry.objects.all().delete()
+                if timeline.fanout_enabled():
+                    for user_id, author_id in Follow.objects.values_list('user_id', 'author_id'):
+                        timeline.backfill(user_id, author_id)
+                # Чем больше у автора подписчиков, тем чаще он публикуется,
+                # так что в замер записи попадают и "знаменитости"
+                writers = rnd.choices(list(popularity), weights=list(popularity.values()),
+                                      k=self.options['writes'])
+                writes = []
+                for author_id in writers:
+                    started = time.perf_counter()
+                    Post.objects.create(text='bench', author_id=author_id)
+                    writes.append(time.perf_counter() - started)
+                reads = []
+                for user_id in rnd.sample(users, min(self.options['reads'], len(users))):
+                    reader = User(pk=user_id)
+                    started = time.perf_counter()
+                    list(timeline.follow_feed(reader)[:10])
+                    reads.append(time.perf_counter() - started)
+            self.stdout.write(f'{strategy:<10}{self.format(writes):>26}{self.format(reads):>26}')
+
+    def create_users(self):
+        User.objects.bulk_create(
+            User(username=f'bench_user_{i}') for i in range(self.options['users']))
+        return list(User.objects.filter(username__startswith='bench_user_').values_list('pk', flat=True))
+
+    def create_follows(self, rnd, users, distribution):
+        """Создаёт подписки и возвращает {id автора: число подписчиков}."""
+        if distribution == 'uniform':
+            weights = [1.0] * len(users)
+        else:
+            # Распределение Парето: немного авторов собирают большинство подписок
+            weights = sorted((rnd.paretovariate(1.2) for _ in users), reverse=True)
+        follows = set()
+        for user_id in users:
+            for author_id in rnd.choices(users, weights=weights, k=self.options['follows']):
+                if author_id != user_id:
+                    follows.add((user_id, author_id))
+        Follow.objects.bulk_create(Follow(user_id=user_id, author_id=author_id) for user_id, author_id in follows)
+        popularity = {}
+        for _, author_id in follows:
+            popularity[author_id] = popularity.get(author_id, 0) + 1
+        return popularity
+
+    @staticmethod
+    def format(samples):
+        mean = statistics.mean(samples) * 1000
+        p95 = sorted(samples)[int(len(samples) * 0.95)] * 1000
+        return f'{mean:.2f} / {p95:.2f}'
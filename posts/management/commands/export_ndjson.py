@@ -0,0 +1,42 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = 'Выгружает записи, комментарии и подписки в NDJSON, порциями по id'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tables', default='',
+                            help='через запятую из: ' + ', '.join(export.TABLES))
+        parser.add_argument('--output', '-o', default='-',
+                            help='файл для выгрузки, "-" - стандартный вывод')
+        parser.add_argument('--gzip', action='store_true',
+                            help='без --output сжатые данные пишутся в двоичный sys.stdout')
+        parser.add_argument('--chunk-size', type=int, default=export.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            tables = export.parse_tables(options['tables'])
+        except ValueError as error:
+            raise CommandError(error)
+        chunks = export.ndjson(tables, options['chunk_size'])
+        if options['gzip']:
+            chunks = export.gzipped(chunks)
+        if options['output'] != '-':
+            with open(options['output'], 'wb') as output:
+                self.write(chunks, output)
+        elif options['gzip']:
+            self.write(chunks, sys.stdout.buffer)
+        else:
+            # текст идёт через self.stdout, в том числе в call_command(stdout=...)
+            for chunk in chunks:
+                self.stdout.write(chunk.decode(), ending='')
+            self.stdout.flush()
+
+    def write(self, chunks, output):
+        for chunk in chunks:
+            output.write(chunk)
+        output.flush()
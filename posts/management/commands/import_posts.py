@@ -0,0 +1,41 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from posts import freshness, importer, timeline
+
+
+class Command(BaseCommand):
+    help = ('Загружает записи, комментарии и подписки из NDJSON '
+            '(формат export_ndjson) или CSV порциями через bulk_create')
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='файлы .ndjson, .csv, можно .gz')
+        parser.add_argument('--model', choices=list(importer.MODELS), default='post',
+                            help='что лежит в CSV-файлах')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--create-missing', action='store_true',
+                            help='создавать неизвестных авторов и группы')
+
+    def handle(self, *args, **options):
+        loader = importer.Importer(batch_size=options['batch_size'],
+                                   create_missing=options['create_missing'],
+                                   report=self.report)
+        for path in options['paths']:
+            for row in importer.read_rows(path, options['model']):
+                loader.add(row)
+        loader.flush()
+        self.stdout.write(self.style.SUCCESS(
+            'Загружено: ' + ', '.join(f'{model} {count}' for model, count in loader.imported.items())
+            + f'; пропущено: {loader.skipped}'))
+
+        # bulk_create не вызывает сигналы - пересчитываем то, что они ведут,
+        # и сбрасываем закэшированные страницы
+        freshness.touch(freshness.SITE)
+        call_command('recount_comments', stdout=self.stdout)
+        call_command('reconcile_stats', stdout=self.stdout)
+        if timeline.fanout_enabled():
+            call_command('rebuild_timelines', stdout=self.stdout)
+
+    def report(self, loader):
+        self.stdout.write(f'строк: {sum(loader.imported.values())}, '
+                          f'пропущено: {loader.skipped}, {loader.rate:.0f} строк/с')
@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from posts import storage
+
+
+class Command(BaseCommand):
+    help = ('Удаляет картинки записей (с миниатюрами), на которые больше '
+            'не ссылается ни одна запись. Запускать по расписанию.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float,
+                            default=storage.GRACE_PERIOD.total_seconds() / 3600,
+                            help='не трогать файлы, освобождённые позже этого')
+
+    def handle(self, *args, **options):
+        deleted = storage.purge(timedelta(hours=options['grace_hours']))
+        self.stdout.write(self.style.SUCCESS(f'Удалено файлов: {deleted}'))
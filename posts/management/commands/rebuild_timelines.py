@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import timeline
+from posts.models import Follow, TimelineEntry
+
+
+class Command(BaseCommand):
+    help = 'Заново заполняет ленты подписок (для FOLLOW_FEED_STRATEGY = "fanout")'
+
+    def handle(self, *args, **options):
+        follows = Follow.objects.values_list('user_id', 'author_id').order_by('pk')
+        with transaction.atomic():
+            TimelineEntry.objects.all().delete()
+            for user_id, author_id in follows.iterator():
+                timeline.backfill(user_id, author_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'Подписок: {follows.count()}, записей в лентах: {TimelineEntry.objects.count()}'))
@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts import freshness
+from posts.models import Post, Follow, AuthorStats
+
+User = get_user_model()
+
+FIELDS = ('posts_count', 'followers_count', 'following_count')
+
+
+def count_of(queryset, field):
+    counts = (queryset.filter(**{field: OuterRef('pk')})
+              .order_by().values(field).annotate(total=Count('pk')).values('total'))
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счётчики AuthorStats с таблицами записей и подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        actual = (User.objects.order_by('pk')
+                  .annotate(posts_count=count_of(Post.objects, 'author'),
+                            followers_count=count_of(Follow.objects, 'author'),
+                            following_count=count_of(Follow.objects, 'user'))
+                  .values_list('pk', *FIELDS))
+        created = updated = 0
+        batch = []
+        for row in actual.iterator():
+            batch.append(row)
+            if len(batch) >= options['batch_size']:
+                created, updated = self.reconcile(batch, created, updated)
+                batch = []
+        created, updated = self.reconcile(batch, created, updated)
+        if created or updated:
+            freshness.touch(freshness.SITE)
+        self.stdout.write(self.style.SUCCESS(f'Создано: {created}, исправлено: {updated}'))
+
+    def reconcile(self, batch, created, updated):
+        stored = AuthorStats.objects.in_bulk([row[0] for row in batch])
+        to_create, to_update = [], []
+        for pk, *values in batch:
+            stats = stored.get(pk)
+            if stats is None:
+                to_create.append(AuthorStats(user_id=pk, **dict(zip(FIELDS, values))))
+            elif [getattr(stats, field) for field in FIELDS] != values:
+                for field, value in zip(FIELDS, values):
+                    setattr(stats, field, value)
+                to_update.append(stats)
+        AuthorStats.objects.bulk_create(to_create, ignore_conflicts=True)
+        AuthorStats.objects.bulk_update(to_update, FIELDS)
+        return created + len(to_create), updated + len(to_update)
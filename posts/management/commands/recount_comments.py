@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts import freshness
+from posts.models import Post, Comment
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает Post.comment_count по таблице комментариев'
+
+    def handle(self, *args, **options):
+        comments = (Comment.objects.filter(post=OuterRef('pk'))
+                    .order_by().values('post').annotate(total=Count('pk')).values('total'))
+        actual = Coalesce(Subquery(comments, output_field=IntegerField()), 0)
+        # Один UPDATE на всю таблицу, и только для разошедшихся записей
+        updated = Post.objects.exclude(comment_count=actual).update(comment_count=actual)
+        if updated:
+            freshness.touch(freshness.SITE)
+        self.stdout.write(self.style.SUCCESS(f'Исправлено записей: {updated}'))
@@ -0,0 +1,51 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts import thumbnails
+from posts.models import ThumbnailTask
+
+
+def build_in_thread(post_id):
+    try:
+        return thumbnails.build_post(post_id)
+    finally:
+        # потоки пула живут дольше задачи, соединение закрываем сами
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры для записей из очереди ThumbnailTask'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4,
+                            help='1 - строить в основном потоке, без пула')
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help='пауза в секундах, когда очередь пуста')
+        parser.add_argument('--once', action='store_true',
+                            help='разобрать очередь и завершиться')
+
+    def handle(self, *args, **options):
+        if options['threads'] <= 1:
+            self.run(options, lambda post_ids: [thumbnails.build_post(pk) for pk in post_ids])
+            return
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            self.run(options, lambda post_ids: list(pool.map(build_in_thread, post_ids)))
+
+    def run(self, options, build):
+        while True:
+            tasks = list(ThumbnailTask.objects.filter(attempts__lt=thumbnails.MAX_ATTEMPTS)
+                         .order_by('pk').values_list('pk', 'post_id', 'image')[:options['batch_size']])
+            if not tasks:
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+                continue
+            started = time.perf_counter()
+            results = build([post_id for _, post_id, _ in tasks])
+            thumbnails.finish([(pk, image) for pk, _, image in tasks], results)
+            self.stdout.write(f'Записей: {len(tasks)}, '
+                              f'{time.perf_counter() - started:.2f} с')
@@ -0,0 +1,100 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+BUILT = 'built'
+SKIPPED = 'skipped'
+MISSING = 'missing'
+FAILED = 'failed'
+
+
+def init_worker():
+    # При запуске через spawn дочернему процессу нужно настроить Django заново
+    django.setup()
+
+
+def warm_image(name):
+    """Строит все стандартные размеры одной картинки, если их ещё нет."""
+    # через поле модели: sorl учитывает хранилище в ключах миниатюр
+    image = Post(image=name).image
+    try:
+        if thumbnails.is_built(image):
+            return SKIPPED
+        if not image.storage.exists(name):
+            return MISSING
+        thumbnails.build(image)
+        thumbnails.refresh_cards(Post.objects.filter(image=name))
+        return BUILT
+    except Exception:
+        thumbnails.logger.exception('Не удалось построить миниатюры %s', name)
+        return FAILED
+
+
+class Command(BaseCommand):
+    help = ('Строит миниатюры всех стандартных размеров для картинок записей '
+            '(MEDIA_ROOT/posts/) в нескольких процессах. Готовые пропускает, '
+            'поэтому после прерывания команду можно просто запустить снова.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=None,
+                            help='по умолчанию - по числу ядер; 1 - без пула')
+        parser.add_argument('--after', type=int, default=0,
+                            help='начать с записей, чей id больше этого')
+        parser.add_argument('--chunk-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        images = (Post.objects.filter(image__startswith='posts/', pk__gt=options['after'])
+                  .order_by('pk').values_list('pk', 'image'))
+        self.total = images.count()
+        self.stats = {BUILT: 0, SKIPPED: 0, MISSING: 0, FAILED: 0}
+        self.started = time.perf_counter()
+        self.last_pk = options['after']
+
+        if options['processes'] == 1:
+            self.run(images, options['chunk_size'], lambda names: map(warm_image, names))
+        else:
+            # Соединения с базой не должны достаться дочерним процессам
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['processes'], initializer=init_worker) as pool:
+                self.run(images, options['chunk_size'], lambda names: pool.map(warm_image, names))
+        self.report(final=True)
+
+    def run(self, images, chunk_size, warm):
+        seen = set()
+        try:
+            while True:
+                # Записи перебираем по id порциями, не держа всю выборку в памяти
+                chunk = list(images.filter(pk__gt=self.last_pk)[:chunk_size])
+                if not chunk:
+                    return
+                names = []
+                for pk, name in chunk:
+                    # одну и ту же картинку могут использовать несколько записей
+                    if name not in seen:
+                        seen.add(name)
+                        names.append(name)
+                    else:
+                        self.stats[SKIPPED] += 1
+                for result in warm(names):
+                    self.stats[result] += 1
+                self.last_pk = chunk[-1][0]
+                self.report()
+        except KeyboardInterrupt:
+            self.stderr.write(f'Прервано. Продолжить: --after {self.last_pk}')
+            raise
+
+    def report(self, final=False):
+        done = sum(self.stats.values())
+        elapsed = time.perf_counter() - self.started
+        rate = done / elapsed if elapsed else 0
+        line = (f'{done}/{self.total} записей ({rate:.1f}/с): '
+                f'построено {self.stats[BUILT]}, готово ранее {self.stats[SKIPPED]}, '
+                f'нет файла {self.stats[MISSING]}, ошибок {self.stats[FAILED]}; '
+                f'последний id {self.last_pk}')
+        self.stdout.write(self.style.SUCCESS(line) if final else line)
@@ -0,0 +1,54 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:00
+
+from django.db import migrations
+
+# Синхронизация индекса при записи. SQLite удаляет триггеры вместе
+# с таблицей, поэтому миграции, пересоздающие posts_post, ставят их заново
+TRIGGERS_SQL = (
+    "CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post BEGIN"
+    " INSERT INTO posts_post_fts (rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post BEGIN"
+    " INSERT INTO posts_post_fts (posts_post_fts, rowid, text) VALUES ('delete', old.id, old.text); END",
+    # счётчики и версия записи меняются часто, индекс трогаем только при правке текста
+    "CREATE TRIGGER posts_post_fts_update AFTER UPDATE OF text ON posts_post BEGIN"
+    " INSERT INTO posts_post_fts (posts_post_fts, rowid, text) VALUES ('delete', old.id, old.text);"
+    " INSERT INTO posts_post_fts (rowid, text) VALUES (new.id, new.text); END",
+)
+
+DROP_TRIGGERS_SQL = (
+    'DROP TRIGGER IF EXISTS posts_post_fts_insert',
+    'DROP TRIGGER IF EXISTS posts_post_fts_delete',
+    'DROP TRIGGER IF EXISTS posts_post_fts_update',
+)
+
+REBUILD_SQL = "INSERT INTO posts_post_fts (posts_post_fts) VALUES ('rebuild')"
+
+# Внешний контент: в индексе только токены, сам текст берётся из posts_post
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+    " text, content='posts_post', content_rowid='id',"
+    " tokenize='unicode61 remove_diacritics 2')",
+) + TRIGGERS_SQL + (REBUILD_SQL,)
+
+DROP_SQL = DROP_TRIGGERS_SQL + ('DROP TABLE IF EXISTS posts_post_fts',)
+
+
+def run(statements):
+    def execute(apps, schema_editor):
+        # на других СУБД поиск работает без индекса, см. posts/search.py
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return execute
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(CREATE_SQL), run(DROP_SQL)),
+    ]
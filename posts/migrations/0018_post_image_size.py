@@ -0,0 +1,33 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:27
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+# На SQLite добавление поля пересоздаёт posts_post, и триггеры
+# полнотекстового индекса пропадают вместе со старой таблицей
+fts = import_module('posts.migrations.0016_post_fts')
+restore_triggers = fts.run(fts.TRIGGERS_SQL + (fts.REBUILD_SQL,))
+drop_triggers = fts.run(fts.DROP_TRIGGERS_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_backfillstate'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_triggers, restore_triggers),
+        migrations.AddField(
+            model_name='post',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(restore_triggers, drop_triggers),
+    ]
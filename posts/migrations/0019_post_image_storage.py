@@ -0,0 +1,23 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:29
+
+from django.db import migrations, models
+import posts.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_post_image_size'),
+    ]
+
+    # Хранилище в базе ничего не меняет, а AlterField на SQLite
+    # пересоздал бы posts_post вместе с триггерами поиска
+    operations = [
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AlterField(
+                model_name='post',
+                name='image',
+                field=models.ImageField(blank=True, null=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/'),
+            ),
+        ]),
+    ]
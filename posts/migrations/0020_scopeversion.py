@@ -0,0 +1,21 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_post_image_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScopeVersion',
+            fields=[
+                ('scope', models.CharField(max_length=200, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+                ('changed', models.DateTimeField()),
+            ],
+        ),
+    ]
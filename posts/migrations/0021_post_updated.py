@@ -0,0 +1,27 @@
+from importlib import import_module
+
+import django.utils.timezone
+from django.db import migrations, models
+
+# Добавление поля пересоздаёт posts_post на SQLite, триггеры
+# полнотекстового индекса ставятся заново, как в 0018
+fts = import_module('posts.migrations.0016_post_fts')
+restore_triggers = fts.run(fts.TRIGGERS_SQL + (fts.REBUILD_SQL,))
+drop_triggers = fts.run(fts.DROP_TRIGGERS_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_scopeversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_triggers, restore_triggers),
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(restore_triggers, drop_triggers),
+    ]
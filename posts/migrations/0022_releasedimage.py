@@ -0,0 +1,20 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_post_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReleasedImage',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('released', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_releasedimage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thumbnailtask',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='thumbnailtask',
+            name='image',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+    ]
@@ -1,6 +1,10 @@
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 
+from .storage import ContentAddressedStorage
+
 
 User = get_user_model()
 
@@ -20,6 +24,25 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Записи для ленты вместе с автором и группой.
+
+        Карточка post_item.html читает все эти поля, поэтому они должны
+        приходить одним запросом, а не отдельным запросом на каждую запись.
+        Число комментариев хранится в самой записи (Post.comment_count).
+        """
+        return self.select_related('author', 'group')
+
+    def bump(self, **fields):
+        """Увеличивает версию карточек и отмечает время изменения.
+
+        UPDATE не заполняет auto_now, поэтому updated ставится здесь:
+        по нему API отдаёт Last-Modified.
+        """
+        return self.update(version=F('version') + 1, updated=timezone.now(), **fields)
+
+
 class Post(models.Model):
     text = models.TextField(
         'Статья',
@@ -35,13 +58,41 @@ class Post(models.Model):
                               related_name='posts',
                               blank=True,
                               null=True)
-    image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    # Файлы называются по содержимому, одинаковые загрузки - один файл,
+    # см. posts/storage.py
+    image = models.ImageField(upload_to='posts/', storage=ContentAddressedStorage(),
+                              blank=True, null=True)
+    # Заполняются при загрузке через PostForm (posts/images.py), чтобы
+    # не открывать файл ради размеров. Не width_field/height_field:
+    # те читают файл при каждой загрузке записи с пустыми размерами
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    # Поддерживается сигналами из posts/signals.py,
+    # пересчитывается командой recount_comments
+    comment_count = models.PositiveIntegerField('Комментариев',
+                                                default=0,
+                                                editable=False)
+    # Версия карточки записи: входит в ключ кэша post_item.html и растёт
+    # при правке записи, новом комментарии, смене имени автора или группы
+    version = models.PositiveIntegerField(default=0, editable=False)
+    # Когда менялась карточка: правка, комментарий (в том числе удалённый),
+    # миниатюра. Массовые изменения ставят его через Post.objects.bump()
+    updated = models.DateTimeField(auto_now=True)
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self):
         return self.text
 
     class Meta:
         ordering = ['-pub_date']
+        # Ленты сортируются по (pub_date, id); id в индексах SQLite
+        # хранится неявно, так что сортировать выборку не приходится
+        indexes = [
+            models.Index(fields=['pub_date'], name='post_pub_date'),
+            models.Index(fields=['group', 'pub_date'], name='post_group_pub_date'),
+            models.Index(fields=['author', 'pub_date'], name='post_author_pub_date'),
+        ]
 
 
 class Comment(models.Model):
@@ -58,6 +109,9 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['post', 'created'], name='comment_post_created'),
+        ]
 
 
 class Follow(models.Model):
@@ -75,3 +129,128 @@ class Follow(models.Model):
 
     def __str__(self):
         return self.author.username
+
+
+class TimelineEntry(models.Model):
+    """Запись в ленте подписок конкретного пользователя.
+
+    Заполняется при публикации (fan-out on write), когда включена
+    настройка FOLLOW_FEED_STRATEGY = 'fanout', см. posts/timeline.py.
+    """
+    user = models.ForeignKey(User,
+                             on_delete=models.CASCADE,
+                             related_name='timeline')
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name='timeline_entries')
+    # Копия post.pub_date: лента читается по индексу (user, pub_date, post)
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='unique_timeline_entry')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'], name='timeline_user_pub_date'),
+        ]
+
+
+class AuthorStats(models.Model):
+    """Счётчики профиля: записи, подписчики и подписки пользователя.
+
+    Меняются на месте сигналами из posts/signals.py,
+    расхождения исправляет команда reconcile_stats.
+    """
+    user = models.OneToOneField(User,
+                                on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name='stats')
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.user_id}: {self.posts_count}/{self.followers_count}/{self.following_count}'
+
+    @classmethod
+    def counted(cls, user_id):
+        """Точные значения счётчиков, посчитанные по таблицам."""
+        return cls(user_id=user_id,
+                   posts_count=Post.objects.filter(author_id=user_id).count(),
+                   followers_count=Follow.objects.filter(author_id=user_id).count(),
+                   following_count=Follow.objects.filter(user_id=user_id).count())
+
+    @classmethod
+    def for_user(cls, user):
+        stats = cls.objects.filter(user=user).first()
+        if stats is None:
+            stats = cls.counted(user.pk)
+            cls.objects.bulk_create([stats], ignore_conflicts=True)
+        return stats
+
+    @classmethod
+    def bump(cls, user_id, field, delta):
+        """Прибавляет delta к счётчику field, например bump(1, 'posts_count', -1)."""
+        stats = cls.objects.filter(user_id=user_id)
+        if delta < 0:
+            # Счётчик не уходит в минус, даже если успел разойтись с таблицами
+            stats = stats.filter(**{f'{field}__gt': 0})
+        if not stats.update(**{field: models.F(field) + delta}) and delta > 0:
+            # Записи ещё нет: создаём её по точным значениям, текущее
+            # изменение к этому моменту уже в базе. При уменьшении
+            # не создаём - это может быть каскадное удаление пользователя,
+            # а недостающую запись позже посчитает for_user
+            cls.objects.bulk_create([cls.counted(user_id)], ignore_conflicts=True)
+
+
+class ThumbnailTask(models.Model):
+    """Запись ждёт построения миниатюр, см. posts/thumbnails.py."""
+    post = models.OneToOneField(Post,
+                                on_delete=models.CASCADE,
+                                related_name='thumbnail_task')
+    # Картинка, для которой поставлена задача: worker удаляет задачу,
+    # только если за время построения картинку не заменили
+    image = models.CharField(max_length=100, blank=True, default='')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+
+
+class BackfillState(models.Model):
+    """Докуда дошло заполнение данных, см. posts/backfill.py."""
+    name = models.CharField(max_length=100, primary_key=True)
+    # Последний обработанный id: следующий запуск продолжит с него
+    last_pk = models.BigIntegerField(default=0)
+    rows = models.PositiveIntegerField(default=0)
+    finished = models.DateTimeField(null=True, blank=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name}: {self.last_pk}'
+
+
+class ScopeVersion(models.Model):
+    """Версия области сайта для ETag и кэша страниц, см. posts/freshness.py.
+
+    Хранится в базе, а не в кэше: кэш у каждого воркера может быть
+    свой, а версия должна быть одна на все процессы.
+    """
+    scope = models.CharField(max_length=200, primary_key=True)
+    # только растёт: каждая запись в области прибавляет единицу
+    version = models.BigIntegerField(default=0)
+    changed = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.scope}: {self.version}'
+
+
+class ReleasedImage(models.Model):
+    """Картинка, на которую перестала ссылаться запись, см. posts/storage.py.
+
+    Файл удаляет команда purge_images не раньше, чем через
+    storage.GRACE_PERIOD, если к тому времени он снова никому не нужен.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    released = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,231 @@
+import base64
+import binascii
+import hashlib
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from . import freshness
+
+# Показывать по 10 записей на странице
+POSTS_PER_PAGE = 10
+
+# Порядок ленты: сначала свежие записи, при равной дате - по id,
+# чтобы позиция каждой записи в ленте была однозначной
+FEED_ORDERING = ('-pub_date', '-id')
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+# Сколько номеров страниц показывать по обе стороны от текущей
+PAGE_WINDOW = 2
+
+# Число записей ленты хранится в кэше, пока не изменится её область
+# (см. posts/freshness.py). Ленты больше COUNT_APPROXIMATE_FROM меняются
+# почти при каждом запросе, их число пересчитывается не чаще раза
+# в COUNT_APPROXIMATE_TIMEOUT секунд и может немного отставать
+COUNT_TIMEOUT = 600
+COUNT_APPROXIMATE_FROM = 10000
+COUNT_APPROXIMATE_TIMEOUT = 60
+
+
+def encode_cursor(post, direction=NEXT):
+    raw = f'{direction}|{post.pub_date.isoformat()}|{post.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает (направление, pub_date, id) или None для битого курсора."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, pub_date, pk = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+def page_window(page, around=PAGE_WINDOW):
+    """Номера страниц для навигации: первая, последняя и around вокруг текущей.
+
+    Пропуски между ними обозначены None, например для 50-й из 5000:
+    [1, None, 48, 49, 50, 51, 52, None, 5000].
+    """
+    last = page.paginator.num_pages
+    numbers = sorted({1, last} | set(range(max(1, page.number - around),
+                                           min(last, page.number + around) + 1)))
+    window = []
+    for number in numbers:
+        if window and number - window[-1] > 1:
+            # пропуск из одной страницы нагляднее показать её номером
+            window.append(number - 1 if number - window[-1] == 2 else None)
+        window.append(number)
+    return window
+
+
+class CursorPage:
+    """Страница ленты, полученная по курсору (pub_date, id).
+
+    Повторяет ту часть интерфейса Page, которой пользуются шаблоны,
+    но не знает ни номера страницы, ни общего числа записей.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return encode_cursor(self.object_list[-1], NEXT)
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return encode_cursor(self.object_list[0], PREVIOUS)
+        return None
+
+
+class CursorPaginator:
+    """Постраничный вывод по ключу (pub_date, id) без COUNT и OFFSET.
+
+    Каждая страница - это выборка "записи старше (или новее) курсора"
+    с LIMIT per_page + 1, поэтому глубокие страницы стоят столько же,
+    сколько первая. object_list должен быть упорядочен так же, как
+    FEED_ORDERING (по убыванию pub_date, затем id), хотя бы и по
+    другим столбцам с теми же значениями.
+    """
+
+    def __init__(self, object_list, per_page=POSTS_PER_PAGE):
+        self.object_list = object_list
+        self.per_page = per_page
+
+    def get_page(self, cursor):
+        position = decode_cursor(cursor) if cursor else None
+        if position is None:
+            return self._page_after(None)
+        direction, pub_date, pk = position
+        if direction == PREVIOUS:
+            return self._page_before(pub_date, pk)
+        return self._page_after((pub_date, pk))
+
+    def _page_after(self, position):
+        queryset = self.object_list
+        if position is not None:
+            pub_date, pk = position
+            queryset = queryset.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk))
+        rows = list(queryset[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        return CursorPage(rows[:self.per_page], self,
+                          has_next=has_next,
+                          has_previous=position is not None)
+
+    def _page_before(self, pub_date, pk):
+        queryset = self.object_list.reverse().filter(
+            Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, id__gt=pk))
+        rows = list(queryset[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return CursorPage(rows, self,
+                          has_next=True,
+                          has_previous=has_previous)
+
+
+def cached_count(queryset, scope, stamps=None):
+    """Число строк queryset из кэша, COUNT(*) - только при промахе.
+
+    stamps - уже прочитанные отметки страницы, в которые входит scope.
+    """
+    signature = hashlib.md5(str(queryset.order_by().query).encode()).hexdigest()
+    approximate_key = f'count:{signature}'
+    count = cache.get(approximate_key)
+    if count is not None:
+        return count
+    if stamps is None:
+        stamps = freshness.stamps([scope])
+    exact_key = f'count:{signature}:{hashlib.md5(repr(stamps).encode()).hexdigest()}'
+    count = cache.get(exact_key)
+    if count is None:
+        count = queryset.count()
+        if count >= COUNT_APPROXIMATE_FROM:
+            cache.set(approximate_key, count, COUNT_APPROXIMATE_TIMEOUT)
+        elif freshness.settled(stamps):
+            cache.set(exact_key, count, COUNT_TIMEOUT)
+    return count
+
+
+def paginate(request, post_list, scope=None, count=None):
+    """Возвращает (paginator, page) для ленты записей.
+
+    Ссылки вида ?cursor= обслуживаются CursorPaginator (пустой курсор -
+    первая страница без COUNT), а ссылки ?page= с номерами страниц -
+    обычным Paginator. У его страниц тоже есть next_cursor и
+    previous_cursor: "Вперёд" и "Назад" в навигации ведут на страницы
+    по курсору, а номера остаются для перехода в произвольное место.
+    Явно заданный порядок сортировки post_list сохраняется.
+
+    Число записей для Paginator берётся из count (например, счётчик
+    AuthorStats), из кэша по области scope или, если не задано
+    ни то ни другое, считается COUNT(*). Счётчику count доверяем только
+    для больших лент (от COUNT_APPROXIMATE_FROM записей), и на последней
+    странице число всё равно уточняется: если счётчик отстал, самые
+    старые записи иначе оказались бы недоступны.
+    """
+    if not post_list.query.order_by:
+        post_list = post_list.order_by(*FEED_ORDERING)
+    if 'cursor' in request.GET:
+        cursor = request.GET['cursor']
+        paginator = CursorPaginator(post_list, POSTS_PER_PAGE)
+        return paginator, paginator.get_page(cursor)
+    paginator = Paginator(post_list, POSTS_PER_PAGE)
+    if count is not None and count < COUNT_APPROXIMATE_FROM:
+        count = None
+    stored = count is not None
+    if count is None and scope is not None:
+        # отметки страницы уже прочитаны декоратором conditional_page
+        count = cached_count(post_list, scope, getattr(request, 'page_stamps', None))
+    if count is not None:
+        # Paginator.count - cached_property, готовое значение
+        # избавляет от запроса COUNT(*)
+        paginator.count = count
+    # Из URL извлекаем номер запрошенной страницы - это значение параметра page
+    page = paginator.get_page(request.GET.get('page'))
+    if stored and not page.has_next():
+        paginator = Paginator(post_list, POSTS_PER_PAGE)
+        page = paginator.get_page(request.GET.get('page'))
+    page.next_cursor = encode_cursor(page[-1], NEXT) if page.has_next() else None
+    page.previous_cursor = encode_cursor(page[0], PREVIOUS) if page.has_previous() else None
+    return paginator, page
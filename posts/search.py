@@ -0,0 +1,43 @@
+"""Полнотекстовый поиск по записям.
+
+В SQLite текст записей проиндексирован в виртуальной таблице FTS5
+posts_post_fts (миграция 0016_post_fts), которую триггеры обновляют
+при создании, правке и удалении записи. Результаты упорядочены
+по релевантности bm25. На других СУБД поиск сводится к icontains.
+"""
+from django.db import connection
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+
+
+def terms(query):
+    return query.split()[:10]
+
+
+def match_expression(words):
+    """Запрос FTS5, в котором каждое слово - отдельная фраза в кавычках.
+
+    Так операторы FTS5 (AND, NEAR, *, двоеточие) в тексте пользователя
+    ищутся как обычные слова и не ломают синтаксис запроса.
+    """
+    return ' '.join('"{}"'.format(word.replace('"', '""')) for word in words)
+
+
+def search_posts(query):
+    """Записи, содержащие все слова query, самые подходящие - первыми."""
+    words = terms(query)
+    posts = Post.objects.for_feed()
+    if not words:
+        return posts.none()
+    if connection.vendor != 'sqlite':
+        for word in words:
+            posts = posts.filter(text__icontains=word)
+        return posts.order_by('-pub_date', '-id')
+    return posts.extra(
+        select={'rank': f'bm25({FTS_TABLE})'},
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = posts_post.id', f'{FTS_TABLE} MATCH %s'],
+        params=[match_expression(words)],
+    ).order_by('rank', '-pub_date', '-id')
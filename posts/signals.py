@@ -0,0 +1,124 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from . import freshness, storage, timeline
+from .models import Post, Group, Comment, Follow, AuthorStats
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        Post.objects.filter(pk=instance.post_id).bump(comment_count=F('comment_count') + 1)
+        freshness.touch(*freshness.post_scopes(instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    # При удалении самой записи комментарии удаляются каскадом,
+    # тогда обновлять уже нечего и UPDATE просто ничего не найдёт
+    if Post.objects.filter(pk=instance.post_id, comment_count__gt=0).bump(
+            comment_count=F('comment_count') - 1):
+        freshness.touch(*freshness.post_scopes(instance.post_id))
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, **kwargs):
+    # страницы, где запись была до правки (например, прежняя группа)
+    instance.old_scopes = freshness.post_scopes(instance.pk) if instance.pk else []
+    update_fields = kwargs.get('update_fields')
+    if instance.pk and (update_fields is None or 'image' in update_fields):
+        instance.old_image = Post.objects.filter(pk=instance.pk).values_list('image', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_published(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.bump(instance.author_id, 'posts_count', 1)
+        if timeline.fanout_enabled():
+            timeline.push_post(instance)
+    else:
+        # запись отредактирована - старая карточка в кэше больше не нужна
+        Post.objects.filter(pk=instance.pk).bump()
+    freshness.touch(*instance.old_scopes, *freshness.post_scopes(instance.pk))
+    old_image = getattr(instance, 'old_image', None)
+    if old_image and old_image != instance.image.name:
+        storage.release(old_image)
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    instance.old_scopes = freshness.post_scopes(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    AuthorStats.bump(instance.author_id, 'posts_count', -1)
+    freshness.touch(*instance.old_scopes)
+    if instance.image:
+        storage.release(instance.image.name)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        # Сначала счётчики: по числу подписчиков лента решает,
+        # раскладывать ли записи автора
+        AuthorStats.bump(instance.author_id, 'followers_count', 1)
+        AuthorStats.bump(instance.user_id, 'following_count', 1)
+        if timeline.fanout_enabled():
+            timeline.backfill(instance.user_id, instance.author_id)
+        touch_profiles(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    AuthorStats.bump(instance.author_id, 'followers_count', -1)
+    AuthorStats.bump(instance.user_id, 'following_count', -1)
+    if timeline.fanout_enabled():
+        timeline.prune(instance.user_id, instance.author_id)
+    touch_profiles(instance)
+
+
+def touch_profiles(follow):
+    # счётчики подписчиков и подписок видны в профилях обоих
+    usernames = User.objects.filter(pk__in=[follow.user_id, follow.author_id]).values_list('username', flat=True)
+    freshness.touch(*map(freshness.profile, usernames))
+
+
+@receiver(pre_save, sender=User)
+def author_renamed(sender, instance, update_fields=None, **kwargs):
+    # при входе Django сохраняет только last_login - имя не меняется
+    if instance.pk is None or (update_fields is not None and 'username' not in update_fields):
+        return
+    old = User.objects.filter(pk=instance.pk).values_list('username', flat=True).first()
+    if old is not None and old != instance.username:
+        Post.objects.filter(author_id=instance.pk).bump()
+        # имя автора есть на карточках во всех лентах
+        freshness.touch(freshness.SITE)
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, **kwargs):
+    if created:
+        freshness.touch(freshness.profile(instance.username))
+
+
+@receiver(post_save, sender=Group)
+def group_changed(sender, instance, created, **kwargs):
+    if not created:
+        Post.objects.filter(group_id=instance.pk).bump()
+        freshness.touch(freshness.SITE)
+    else:
+        freshness.touch(freshness.group(instance.slug))
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # SET_NULL у Post.group - массовый UPDATE без сигналов, поэтому
+    # карточки и страницы со ссылкой на группу сбрасываем здесь
+    Post.objects.filter(group=instance).bump()
+    freshness.touch(freshness.group(instance.slug), freshness.SITE)
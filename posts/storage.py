@@ -0,0 +1,95 @@
+"""Хранилище картинок записей с именами по содержимому.
+
+Одни и те же мемы и репосты загружают снова и снова, а обычное
+хранилище на каждую загрузку заводит новый файл posts/name_XXXX.jpg
+со своим набором миниатюр. Здесь файл называется по sha256 содержимого:
+posts/ab/ab12...ef.jpg. Повторная загрузка того же файла ничего не
+пишет на диск и получает имя уже сохранённого, а значит, и его
+готовые миниатюры.
+
+Один файл может принадлежать нескольким записям, поэтому при удалении
+записи (или замене картинки) файл не удаляется сразу: release отмечает
+его в ReleasedImage, а команда purge_images через GRACE_PERIOD удаляет
+файл с миниатюрами, если на него так и не сослалась ни одна запись.
+Загрузка того же содержимого снимает отметку. Так файл не пропадёт
+из-под записи, которая получила его имя, но ещё не сохранена.
+"""
+import hashlib
+import logging
+import posixpath
+from datetime import timedelta
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Сколько отмеченный файл ждёт удаления
+GRACE_PERIOD = timedelta(days=1)
+
+
+def content_name(name, content):
+    """Имя файла по содержимому: каталог из name, подкаталог по хэшу."""
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in iter(lambda: content.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+    content.seek(0)
+    hexdigest = digest.hexdigest()
+    directory, filename = posixpath.split(name)
+    extension = posixpath.splitext(filename)[1].lower()
+    return posixpath.join(directory, hexdigest[:2], hexdigest + extension)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        name = content_name(name, content)
+        if self.exists(name):
+            # purge удаляет файл в той же транзакции, что и отметку,
+            # поэтому после снятия отметки файл либо есть, либо уже удалён
+            cancel_release(name)
+            if self.exists(name):
+                return name
+        # при одновременной загрузке одного и того же файла второй
+        # получит имя с суффиксом - лишняя копия, но ничего не потеряно
+        return super().save(name, content, max_length)
+
+
+def release(name):
+    """Отмечает файл, на который перестала ссылаться запись."""
+    from .models import ReleasedImage
+    ReleasedImage.objects.update_or_create(name=name)
+
+
+def cancel_release(name):
+    from .models import ReleasedImage
+    ReleasedImage.objects.filter(name=name).delete()
+
+
+def purge(grace=GRACE_PERIOD):
+    """Удаляет отмеченные раньше grace файлы без ссылок. Возвращает их число."""
+    from .models import Post, ReleasedImage
+    from .thumbnails import delete
+    cutoff = timezone.now() - grace
+    deleted = 0
+    for name in ReleasedImage.objects.filter(released__lt=cutoff).values_list('name', flat=True):
+        with transaction.atomic():
+            # отметку снимаем первой: одновременная загрузка того же
+            # файла ждёт конца транзакции и потом запишет его заново
+            if not ReleasedImage.objects.filter(name=name, released__lt=cutoff).delete()[0]:
+                continue
+            if Post.objects.filter(image=name).exists():
+                continue
+            try:
+                delete(Post(image=name).image)
+            except Exception:
+                # записи из старых загрузок могут ссылаться на файлы вне MEDIA_ROOT
+                logger.exception('Не удалось удалить картинку %s', name)
+                continue
+            deleted += 1
+    return deleted
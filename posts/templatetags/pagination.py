@@ -0,0 +1,11 @@
+from django import template
+
+from posts import paginator
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_window(page, around=paginator.PAGE_WINDOW):
+    """Номера страниц вокруг текущей, None на месте пропуска."""
+    return paginator.page_window(page, around)
@@ -0,0 +1,39 @@
+import logging
+
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+logger = logging.getLogger(__name__)
+
+# Ширина картинки на странице: на узком экране во всю ширину, иначе
+# не шире основного контейнера - по ней браузер выбирает из srcset
+PICTURE_SIZES = '(max-width: 960px) 100vw, 960px'
+
+
+def srcset(image, sizes):
+    built = (thumbnails.get_prebuilt(image, size) for size in sizes)
+    return ', '.join(f'{thumbnail.url} {thumbnail.width}w' for thumbnail in built if thumbnail)
+
+
+@register.inclusion_tag('picture.html')
+def post_picture(post, size='card'):
+    """<picture> с миниатюрами нескольких ширин в WebP и JPEG.
+
+    Пока основной размер не построен, выводится исходная картинка
+    с размерами из Post.image_width/image_height.
+    """
+    context = {'post': post, 'sizes': PICTURE_SIZES}
+    if not post.image:
+        return context
+    try:
+        context['img'] = thumbnails.get_prebuilt(post.image, size)
+        if context['img'] is not None:
+            variants = thumbnails.PICTURES[size]
+            context['jpeg'] = srcset(post.image, variants)
+            context['webp'] = srcset(post.image, [variant + thumbnails.WEBP for variant in variants])
+    except Exception:
+        logger.exception('Не удалось найти миниатюры %s', post.image)
+        context['img'] = None
+    return context
@@ -0,0 +1,127 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import parse_http_date
+
+from posts.models import Post, Group, Comment, Follow, ScopeVersion
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.guest_client = Client()
+        cls.user = User.objects.create_user(username='Gena')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.reader)
+        cls.group = Group.objects.create(title='Название группы',
+                                         slug='test-group',
+                                         description='Описание группы')
+
+    def setUp(self):
+        self.posts = [Post.objects.create(text=f'Запись {i}', author=ApiTest.user, group=ApiTest.group)
+                      for i in range(12)]
+
+    def test_feeds(self):
+        Follow.objects.create(user=ApiTest.reader, author=ApiTest.user)
+        urls = [reverse('api_index'),
+                reverse('api_group_posts', kwargs={'slug': 'test-group'}),
+                reverse('api_profile', kwargs={'username': 'Gena'}),
+                reverse('api_follow_index')]
+        for url in urls:
+            with self.subTest(url=url):
+                data = ApiTest.authorized_client.get(url).json()
+                self.assertEqual(data['count'], 12)
+                self.assertEqual(data['results'][0]['id'], self.posts[-1].pk)
+                self.assertEqual(data['results'][0]['author'], 'Gena')
+                self.assertEqual(data['results'][0]['group'], 'test-group')
+                self.assertEqual(data['next'], f'{url}?page=2')
+                self.assertIsNone(data['previous'])
+
+    def test_cursor_links(self):
+        data = ApiTest.guest_client.get(reverse('api_index'), {'cursor': ''}).json()
+        self.assertNotIn('count', data)
+        data = ApiTest.guest_client.get(data['next']).json()
+        self.assertEqual([post['id'] for post in data['results']], [self.posts[1].pk, self.posts[0].pk])
+        self.assertIsNone(data['next'])
+
+    def test_follow_requires_login(self):
+        response = ApiTest.guest_client.get(reverse('api_follow_index'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_post(self):
+        post = self.posts[0]
+        Comment.objects.create(text='Комментарий', author=ApiTest.reader, post=post)
+        response = ApiTest.guest_client.get(reverse('api_post', kwargs={'post_id': post.pk}))
+        data = response.json()
+        self.assertEqual(data['comment_count'], 1)
+        self.assertEqual(data['comments'][0]['author'], 'Reader')
+        self.assertEqual(ApiTest.guest_client.get(reverse('api_post', kwargs={'post_id': 0})).status_code, 404)
+
+    @staticmethod
+    def backdate(seconds=60):
+        # Last-Modified отдаётся, только когда секунда изменения прошла;
+        # сдвигаем назад всё, что изменилось позже этого момента
+        moment = timezone.now() - timedelta(seconds=seconds)
+        Post.objects.filter(updated__gt=moment).update(updated=moment)
+        ScopeVersion.objects.filter(changed__gt=moment).update(changed=moment)
+
+    def test_not_modified(self):
+        url = reverse('api_index')
+        self.backdate()
+        response = ApiTest.guest_client.get(url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        # страница не менялась - 304 без тела
+        response = ApiTest.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        # новый комментарий к записи на странице меняет ETag
+        Comment.objects.create(text='Комментарий', author=ApiTest.reader, post=self.posts[-1])
+        response = ApiTest.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_post_not_modified(self):
+        url = reverse('api_post', kwargs={'post_id': self.posts[0].pk})
+        etag = ApiTest.guest_client.get(url)['ETag']
+        self.assertEqual(ApiTest.guest_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # правка записи увеличивает её версию
+        post = self.posts[0]
+        post.text = 'Правка'
+        post.save()
+        self.assertEqual(ApiTest.guest_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_last_modified_moves_on_every_change(self):
+        post = self.posts[-1]
+        comment = Comment.objects.create(text='Комментарий', author=ApiTest.reader, post=post)
+        urls = [reverse('api_post', kwargs={'post_id': post.pk}), reverse('api_index')]
+        changes = [lambda: Post.objects.filter(pk=post.pk).first().save(),
+                   comment.delete,
+                   # запись уходит со страницы, оставшиеся не меняются
+                   lambda: Post.objects.filter(pk=self.posts[5].pk).first().delete()]
+        for change in changes:
+            self.backdate()
+            since = {url: ApiTest.guest_client.get(url)['Last-Modified'] for url in urls}
+            change()
+            self.backdate(30)
+            for url in urls[1:] if change is changes[-1] else urls:
+                with self.subTest(url=url):
+                    response = ApiTest.guest_client.get(url, HTTP_IF_MODIFIED_SINCE=since[url])
+                    self.assertEqual(response.status_code, 200)
+                    self.assertGreater(parse_http_date(response['Last-Modified']),
+                                       parse_http_date(since[url]))
+
+    def test_follow_feed_has_no_last_modified(self):
+        Follow.objects.create(user=ApiTest.reader, author=ApiTest.user)
+        self.backdate()
+        response = ApiTest.authorized_client.get(reverse('api_follow_index'))
+        self.assertTrue(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
@@ -0,0 +1,56 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Post, Comment, BackfillState
+
+User = get_user_model()
+
+
+class BackfillTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Gena')
+
+    def setUp(self):
+        self.posts = [Post.objects.create(text=f'Запись {i}', author=BackfillTest.user) for i in range(5)]
+        for post in self.posts:
+            Comment.objects.create(text='Комментарий', author=BackfillTest.user, post=post)
+        # счётчики разошлись с таблицей комментариев
+        Post.objects.update(comment_count=0)
+
+    def backfill(self, *args):
+        out = StringIO()
+        call_command('backfill', 'comment_count', '--batch-size', '2', *args, stdout=out)
+        return out.getvalue()
+
+    def counts(self):
+        return list(Post.objects.order_by('pk').values_list('comment_count', flat=True))
+
+    def test_resumes_from_watermark(self):
+        output = self.backfill('--max-batches', '1')
+        self.assertIn('строк 2', output)
+        self.assertIn('остановлено', output)
+        self.assertEqual(self.counts(), [1, 1, 0, 0, 0])
+        state = BackfillState.objects.get(name='comment_count')
+        self.assertEqual(state.last_pk, self.posts[1].pk)
+        self.assertIsNone(state.finished)
+
+        output = self.backfill()
+        self.assertIn('готово', output)
+        self.assertEqual(self.counts(), [1] * 5)
+        state.refresh_from_db()
+        self.assertEqual((state.last_pk, state.rows), (self.posts[-1].pk, 5))
+        self.assertIsNotNone(state.finished)
+
+    def test_restart(self):
+        self.backfill()
+        Post.objects.update(comment_count=0)
+        # без --restart все строки уже пройдены
+        self.backfill()
+        self.assertEqual(self.counts(), [0] * 5)
+        self.backfill('--restart')
+        self.assertEqual(self.counts(), [1] * 5)
@@ -0,0 +1,63 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from yatube.cache import SQLiteCache
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_set_get_delete(self):
+        self.cache.set('post', {'text': 'Тестовый текст'})
+        self.assertEqual(self.cache.get('post'), {'text': 'Тестовый текст'})
+        self.cache.delete('post')
+        self.assertIsNone(self.cache.get('post'))
+
+    def test_shared_between_instances(self):
+        # второй экземпляр - как другой воркер на том же сервере
+        self.cache.set('post', 1)
+        other = self.make_cache()
+        self.assertEqual(other.get('post'), 1)
+        self.assertEqual(other.incr('post'), 2)
+        self.assertEqual(self.cache.get('post'), 2)
+
+    def test_expiry_and_add(self):
+        self.cache.set('gone', 1, timeout=0)
+        self.assertIsNone(self.cache.get('gone'))
+        self.assertTrue(self.cache.add('gone', 2))
+        self.assertFalse(self.cache.add('gone', 3))
+        self.assertEqual(self.cache.get('gone'), 2)
+
+    def test_lru_eviction(self):
+        cache = self.make_cache(MAX_ENTRIES=3, CULL_FREQUENCY=3)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+        # читаем 'a' позже остальных - вытеснен будет 'b'
+        time.sleep(1.1)
+        cache.get('a')
+        cache.set('d', 'd')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 'a')
+        self.assertEqual(cache.get('d'), 'd')
+
+    def test_size_limit(self):
+        cache = self.make_cache(MAX_SIZE=2000)
+        self.assertFalse(cache.add('huge', 'x' * 5000))
+        for key in range(5):
+            cache.set(key, 'x' * 500)
+        total = sum(1 for key in range(5) if cache.has_key(key))
+        self.assertLess(total, 5)
+        self.assertTrue(cache.has_key(4))
@@ -0,0 +1,149 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.test import TestCase, TransactionTestCase, Client, RequestFactory, override_settings
+from django.urls import reverse
+
+from posts.models import Post, Group
+from yatube import db_router
+
+User = get_user_model()
+
+REPLICA_DATABASES = {**settings.DATABASES, 'replica': {**settings.DATABASES['default'], 'NAME': 'replica.sqlite3'}}
+
+
+class RouterTest(TestCase):
+    def setUp(self):
+        # вне запроса отметка о записи живёт до конца потока,
+        # а подготовка тестов уже писала в базу
+        token = db_router.wrote.set(False)
+        self.addCleanup(db_router.wrote.reset, token)
+
+    def test_without_replica_everything_goes_to_default(self):
+        self.assertEqual(Post.objects.all().db, 'default')
+
+    @override_settings(DATABASES=REPLICA_DATABASES)
+    def test_reads_go_to_replica(self):
+        self.assertEqual(Post.objects.all().db, 'replica')
+        # сессии нельзя читать с отстающей реплики
+        self.assertEqual(Session.objects.all().db, 'default')
+
+    @override_settings(DATABASES=REPLICA_DATABASES)
+    def test_pinned_reads_go_to_default(self):
+        token = db_router.pinned.set(True)
+        try:
+            self.assertEqual(Post.objects.all().db, 'default')
+        finally:
+            db_router.pinned.reset(token)
+
+    @override_settings(DATABASES=REPLICA_DATABASES)
+    def test_write_pins_rest_of_command(self):
+        Group.objects.create(title='Название группы', slug='test-group', description='')
+        self.assertEqual(Post.objects.all().db, 'default')
+
+
+@override_settings(DATABASES=REPLICA_DATABASES)
+class PinPrimaryMiddlewareTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.reads = []
+
+    def reading_view(self, request):
+        self.reads.append(Post.objects.all().db)
+        return HttpResponse()
+
+    def writing_view(self, request):
+        self.reads.append(Post.objects.all().db)
+        Group.objects.create(title='Название группы', slug='test-group', description='')
+        # после записи в том же запросе - только основная база
+        self.reads.append(Post.objects.all().db)
+        return HttpResponse()
+
+    def test_write_pins_following_requests(self):
+        response = db_router.PinPrimaryMiddleware(self.writing_view)(self.factory.get('/'))
+        self.assertEqual(self.reads, ['replica', 'default'])
+        cookie = response.cookies[db_router.PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
+
+        request = self.factory.get('/')
+        request.COOKIES[db_router.PIN_COOKIE] = cookie.value
+        db_router.PinPrimaryMiddleware(self.reading_view)(request)
+        # запрос без куки снова читает с реплики
+        response = db_router.PinPrimaryMiddleware(self.reading_view)(self.factory.get('/'))
+        self.assertEqual(self.reads[2:], ['default', 'replica'])
+        self.assertNotIn(db_router.PIN_COOKIE, response.cookies)
+
+    def test_unsafe_methods_read_primary(self):
+        db_router.PinPrimaryMiddleware(self.reading_view)(self.factory.post('/'))
+        self.assertEqual(self.reads, ['default'])
+
+
+class ReplicaFileTest(TransactionTestCase):
+    """Реплика - настоящий файл SQLite, копия основной базы."""
+    databases = {'default', db_router.REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        # реплика должна быть в DATABASES до super(): там проверяется databases
+        cls.directory = tempfile.mkdtemp()
+        connections.databases[db_router.REPLICA] = {
+            **connections.databases['default'],
+            'NAME': os.path.join(cls.directory, 'replica.sqlite3'),
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[db_router.REPLICA].close()
+        del connections[db_router.REPLICA]
+        connections.databases.pop(db_router.REPLICA)
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Gena')
+        self.client = Client()
+        self.client.force_login(self.user)
+        Post.objects.create(text='Запись из основной базы', author=self.user)
+
+    def replicate(self):
+        """Копирует основную базу в файл реплики, как внешняя репликация."""
+        connections[db_router.REPLICA].close()
+        primary = connections['default']
+        primary.ensure_connection()
+        replica = sqlite3.connect(connections.databases[db_router.REPLICA]['NAME'])
+        try:
+            primary.connection.backup(replica)
+            # отметим записи на реплике, чтобы видеть, откуда их прочитали;
+            # версия другая, иначе карточки двух баз делили бы ключ кэша
+            replica.execute("UPDATE posts_post SET text = 'Запись с реплики', version = version + 1000")
+            replica.commit()
+        finally:
+            replica.close()
+
+    def test_feed_reads_replica_until_user_writes(self):
+        self.replicate()
+        self.assertTrue(db_router.replica_enabled())
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'Запись с реплики')
+        self.assertNotContains(response, 'Запись из основной базы')
+
+        self.client.post(reverse('new_post'), data={'text': 'Новая запись'})
+        # сразу после записи пользователь читает из основной базы
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'Запись из основной базы')
+        self.assertContains(response, 'Новая запись')
+        self.assertNotContains(response, 'Запись с реплики')
+        # остальные читают с реплики, куда новая запись ещё не дошла
+        response = Client().get(reverse('index'))
+        self.assertContains(response, 'Запись с реплики')
+        self.assertNotContains(response, 'Новая запись')
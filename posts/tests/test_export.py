@@ -0,0 +1,79 @@
+import gzip
+import json
+import os
+import tempfile
+from io import BytesIO, StringIO, TextIOWrapper
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.models import Post, Group, Comment, Follow
+
+User = get_user_model()
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Gena')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.admin = User.objects.create_user(username='Admin', is_staff=True)
+        cls.admin_client = Client()
+        cls.admin_client.force_login(cls.admin)
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+        cls.group = Group.objects.create(title='Название группы',
+                                         slug='test-group',
+                                         description='Описание группы')
+        cls.posts = [Post.objects.create(text=f'Запись {i}', author=cls.user, group=cls.group)
+                     for i in range(3)]
+        Comment.objects.create(text='Комментарий', author=cls.reader, post=cls.posts[0])
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def check_rows(self, lines):
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row['model'] for row in rows], ['post'] * 3 + ['comment', 'follow'])
+        self.assertEqual([row['id'] for row in rows[:3]], [post.pk for post in ExportTest.posts])
+        self.assertEqual(rows[0]['author'], 'Gena')
+        self.assertEqual(rows[0]['group'], 'test-group')
+        self.assertEqual(rows[3]['post'], ExportTest.posts[0].pk)
+        self.assertEqual((rows[4]['user'], rows[4]['author']), ('Reader', 'Gena'))
+
+    def test_command(self):
+        out = StringIO()
+        # порции меньше таблицы записей: выгрузка продолжается по id
+        call_command('export_ndjson', '--chunk-size', '2', stdout=out)
+        self.check_rows(out.getvalue().splitlines())
+
+    def test_command_gzip_file(self):
+        fd, path = tempfile.mkstemp(suffix='.ndjson.gz')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        call_command('export_ndjson', '--gzip', '--output', path)
+        with gzip.open(path, 'rt', encoding='utf-8') as exported:
+            self.check_rows(exported.read().splitlines())
+
+    def test_command_gzip_stdout(self):
+        stdout = TextIOWrapper(BytesIO())
+        with patch('sys.stdout', stdout):
+            call_command('export_ndjson', '--gzip')
+        self.check_rows(gzip.decompress(stdout.buffer.getvalue()).decode().splitlines())
+
+    def test_endpoint_requires_staff(self):
+        response = ExportTest.reader_client.get(reverse('export_ndjson'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_endpoint_streams(self):
+        response = ExportTest.admin_client.get(reverse('export_ndjson'))
+        self.assertTrue(response.streaming)
+        self.check_rows(b''.join(response.streaming_content).decode().splitlines())
+
+        response = ExportTest.admin_client.get(reverse('export_ndjson'), {'tables': 'follow', 'gzip': 1})
+        rows = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(len(rows), 1)
+        response = ExportTest.admin_client.get(reverse('export_ndjson'), {'tables': 'users'})
+        self.assertEqual(response.status_code, 400)
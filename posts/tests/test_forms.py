@@ -106,6 +106,17 @@ class PostNewFormTest(TestCase):
         # Проверяем, что создалась запись изменилась
         self.assertTrue(Post.objects.filter(text='Измененная тестовая запись').exists())
 
+    def test_edit_replaces_image(self):
+        self.assertFalse(Post.objects.get(pk=1).image)
+        uploaded = SimpleUploadedFile(name='edit.gif', content=PostNewFormTest.small_gif,
+                                      content_type='image/gif')
+        PostNewFormTest.authorized_client.post(
+            reverse('post_edit', kwargs={'username': 'Gena', 'post_id': 1}),
+            data={'text': 'Запись с картинкой', 'image': uploaded})
+        post = Post.objects.get(pk=1)
+        self.assertTrue(post.image.name.startswith('posts/'))
+        self.assertEqual((post.image_width, post.image_height), (2, 1))
+
     def test_create_comment(self):
         comment_count = Comment.objects.count()
         form_data = {'text': 'Комментарий статьи'}
@@ -115,5 +126,7 @@ class PostNewFormTest(TestCase):
             data=form_data,
             follow=True)
         self.assertEqual(Comment.objects.count(), comment_count + 1)
+        # Счётчик комментариев записи увеличился вместе с ними
+        self.assertEqual(Post.objects.get(pk=1).comment_count, Comment.objects.filter(post_id=1).count())
         # Проверяем, сработал ли редирект
         self.assertRedirects(response, reverse('post', kwargs={'username': 'Gena', 'post_id': 1}))
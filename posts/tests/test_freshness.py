@@ -0,0 +1,160 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Post, Group, Comment, Follow, ScopeVersion
+
+User = get_user_model()
+
+
+class ConditionalPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.guest_client = Client()
+        cls.user = User.objects.create_user(username='Gena')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.reader)
+        cls.group = Group.objects.create(title='Название группы',
+                                         slug='test-group',
+                                         description='Описание группы')
+        cls.other_group = Group.objects.create(title='Другая группа',
+                                               slug='other-group',
+                                               description='Описание группы')
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(text='Тестовый текст', author=ConditionalPagesTest.user,
+                                        group=ConditionalPagesTest.group)
+        self.urls = {'index': reverse('index'),
+                     'group': reverse('group_posts', kwargs={'slug': 'test-group'}),
+                     'other_group': reverse('group_posts', kwargs={'slug': 'other-group'}),
+                     'profile': reverse('profile', kwargs={'username': 'Gena'}),
+                     'post': reverse('post', kwargs={'username': 'Gena', 'post_id': self.post.pk})}
+
+    def etags(self, client=None):
+        client = client or ConditionalPagesTest.guest_client
+        return {name: client.get(url)['ETag'] for name, url in self.urls.items()}
+
+    def changed(self, before):
+        return {name for name, etag in self.etags().items() if etag != before[name]}
+
+    def test_not_modified_by_versions(self):
+        response = ConditionalPagesTest.guest_client.get(self.urls['index'])
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('s-maxage', response['Cache-Control'])
+        # только выборка версий страницы, без шаблона и записей
+        with self.assertNumQueries(1):
+            response = ConditionalPagesTest.guest_client.get(
+                self.urls['index'], HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_authorized_pages_are_private(self):
+        response = ConditionalPagesTest.authorized_client.get(self.urls['index'])
+        self.assertIn('private', response['Cache-Control'])
+        # у вошедшего пользователя своя версия страницы
+        self.assertNotEqual(response['ETag'], self.etags()['index'])
+
+    def test_login_changes_etag(self):
+        User.objects.create_user(username='Writer', password='secret-password')
+        client = Client()
+        credentials = {'username': 'Writer', 'password': 'secret-password'}
+        client.post(reverse('login'), credentials)
+        response = client.get(self.urls['post'])
+        etag = response['ETag']
+        self.assertFalse(response.has_header('Last-Modified'))
+        client.logout()
+        # вход через форму, как в браузере: он выдаёт новый CSRF-токен
+        client.post(reverse('login'), credentials)
+        # после входа CSRF-токен новый, страницу со старым не отдаём
+        response = client.get(self.urls['post'], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(client.get(self.urls['post'], HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_comment_changes_post_feeds(self):
+        before = self.etags()
+        Comment.objects.create(text='Комментарий', author=ConditionalPagesTest.reader, post=self.post)
+        self.assertEqual(self.changed(before), {'index', 'group', 'profile', 'post'})
+
+    def test_edit_changes_old_and_new_group(self):
+        before = self.etags()
+        self.post.group = ConditionalPagesTest.other_group
+        self.post.save()
+        self.assertEqual(self.changed(before), {'index', 'group', 'other_group', 'profile', 'post'})
+
+    def test_follow_changes_profile(self):
+        before = self.etags()
+        Follow.objects.create(user=ConditionalPagesTest.reader, author=ConditionalPagesTest.user)
+        self.assertEqual(self.changed(before), {'profile', 'post'})
+
+    def test_new_post_in_other_group(self):
+        before = self.etags()
+        Post.objects.create(text='Ещё запись', author=ConditionalPagesTest.reader,
+                            group=ConditionalPagesTest.other_group)
+        self.assertEqual(self.changed(before), {'index', 'other_group'})
+
+    def test_writes_in_one_second_change_etag(self):
+        before = self.etags()['post']
+        for text in ('Первая правка', 'Вторая правка'):
+            self.post.text = text
+            self.post.save()
+            etag = self.etags()['post']
+            self.assertNotEqual(etag, before)
+            before = etag
+
+    def test_versions_are_shared_between_processes(self):
+        before = self.etags()
+        Comment.objects.create(text='Комментарий', author=ConditionalPagesTest.reader, post=self.post)
+        # кэш другого воркера не знает о записи, версии - в общей базе
+        cache.clear()
+        self.assertEqual(self.changed(before), {'index', 'group', 'profile', 'post'})
+
+    def test_last_modified_waits_for_second_to_pass(self):
+        response = ConditionalPagesTest.guest_client.get(self.urls['post'])
+        self.assertFalse(response.has_header('Last-Modified'))
+        ScopeVersion.objects.update(changed=timezone.now() - timedelta(minutes=1))
+        response = ConditionalPagesTest.guest_client.get(self.urls['post'])
+        self.assertTrue(response.has_header('Last-Modified'))
+
+    def test_delete(self):
+        before = self.etags()
+        Post.objects.filter(pk=self.post.pk).first().delete()
+        del self.urls['post']
+        self.assertEqual(self.changed(before), {'index', 'group', 'profile'})
+
+    def test_group_delete(self):
+        group = Group.objects.create(title='Удаляемая группа', slug='gone', description='Описание')
+        Post.objects.create(text='Запись в группе', author=ConditionalPagesTest.user, group=group)
+        url = reverse('group_posts', kwargs={'slug': 'gone'})
+        self.assertEqual(ConditionalPagesTest.guest_client.get(url).status_code, 200)
+        self.assertContains(ConditionalPagesTest.guest_client.get(self.urls['index']), url)
+        index_etag = ConditionalPagesTest.guest_client.get(self.urls['index'])['ETag']
+        group.delete()
+        self.assertEqual(ConditionalPagesTest.guest_client.get(url).status_code, 404)
+        response = ConditionalPagesTest.guest_client.get(self.urls['index'])
+        self.assertNotEqual(response['ETag'], index_etag)
+        # закэшированная карточка записи больше не ссылается на группу
+        self.assertNotContains(response, url)
+
+    def test_anonymous_page_cache(self):
+        first = ConditionalPagesTest.guest_client.get(self.urls['group'])
+        with self.assertNumQueries(1):
+            cached = ConditionalPagesTest.guest_client.get(self.urls['group'])
+        self.assertEqual(cached.content, first.content)
+        ConditionalPagesTest.guest_client.get(self.urls['other_group'])
+
+        Comment.objects.create(text='Комментарий', author=ConditionalPagesTest.reader, post=self.post)
+        # другая группа записи не содержит и осталась в кэше
+        with self.assertNumQueries(1):
+            ConditionalPagesTest.guest_client.get(self.urls['other_group'])
+        response = ConditionalPagesTest.guest_client.get(self.urls['group'])
+        self.assertContains(response, 'Комментариев: 1')
+        # вошедшим пользователям страница рисуется заново
+        response = ConditionalPagesTest.authorized_client.get(self.urls['group'])
+        self.assertIsNotNone(response.context)
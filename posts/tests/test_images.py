@@ -0,0 +1,105 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import images
+from posts.models import Post
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+# тег EXIF Orientation: 6 - снимок нужно повернуть на 90° по часовой
+ORIENTATION = 0x0112
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageIngestTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Gena')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+
+    @staticmethod
+    def get_photo(name='photo.jpg'):
+        """Снимок 4000x3000, который по EXIF нужно повернуть."""
+        exif = Image.Exif()
+        exif[ORIENTATION] = 6
+        file_obj = BytesIO()
+        Image.new('RGB', (4000, 3000), color=(0, 120, 200)).save(file_obj, 'jpeg', exif=exif)
+        return SimpleUploadedFile(name, file_obj.getvalue(), content_type='image/jpeg')
+
+    @staticmethod
+    def get_animation(name='anim.gif'):
+        frames = [Image.new('P', (300, 200), color=i) for i in range(3)]
+        file_obj = BytesIO()
+        frames[0].save(file_obj, 'gif', save_all=True, append_images=frames[1:])
+        return SimpleUploadedFile(name, file_obj.getvalue(), content_type='image/gif')
+
+    def test_photo_is_rotated_capped_and_stripped(self):
+        content, width, height = images.ingest(self.get_photo())
+        self.assertEqual((width, height), (1536, 2048))
+        image = Image.open(content)
+        self.assertEqual(image.format, 'JPEG')
+        self.assertEqual(image.size, (1536, 2048))
+        self.assertNotIn(ORIENTATION, image.getexif())
+        self.assertEqual(content.name, 'photo.jpg')
+
+    def test_transparent_image_stays_png(self):
+        file_obj = BytesIO()
+        Image.new('RGBA', (100, 50), color=(0, 0, 0, 0)).save(file_obj, 'png')
+        content, width, height = images.ingest(
+            SimpleUploadedFile('logo.png', file_obj.getvalue(), content_type='image/png'))
+        self.assertEqual(Image.open(content).format, 'PNG')
+        self.assertEqual((width, height), (100, 50))
+
+    def test_animation_is_kept_as_is(self):
+        upload = self.get_animation()
+        original = upload.read()
+        content, width, height = images.ingest(upload)
+        self.assertEqual((width, height), (300, 200))
+        self.assertEqual(content.read(), original)
+
+    def test_new_post_records_dimensions(self):
+        ImageIngestTest.authorized_client.post(
+            reverse('new_post'), data={'text': 'Фото', 'image': self.get_photo()})
+        post = Post.objects.get(text='Фото')
+        self.assertEqual((post.image_width, post.image_height), (1536, 2048))
+        self.assertEqual(post.image.width, 1536)
+
+    def test_clearing_image_resets_dimensions(self):
+        ImageIngestTest.authorized_client.post(
+            reverse('new_post'), data={'text': 'Фото', 'image': self.get_photo()})
+        post = Post.objects.get(text='Фото')
+        ImageIngestTest.authorized_client.post(
+            reverse('post_edit', args=[post.author.username, post.pk]),
+            data={'text': 'Фото', 'image-clear': 'on'})
+        post.refresh_from_db()
+        self.assertFalse(post.image)
+        self.assertIsNone(post.image_width)
+
+    def test_backfill_fills_old_posts(self):
+        old = Post.objects.create(text='Старая', author=ImageIngestTest.user, image=self.get_animation())
+        Post.objects.create(text='Файл потерян', author=ImageIngestTest.user, image='posts/lost.png')
+        call_command('backfill', 'image_dimensions', stdout=StringIO())
+        old.refresh_from_db()
+        self.assertEqual((old.image_width, old.image_height), (300, 200))
+        self.assertIsNone(Post.objects.get(text='Файл потерян').image_width)
@@ -0,0 +1,69 @@
+import csv
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Post, Group, Comment, Follow, AuthorStats
+
+User = get_user_model()
+
+
+class ImportTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def test_round_trip_with_export(self):
+        user = User.objects.create_user(username='Gena')
+        reader = User.objects.create_user(username='Reader')
+        group = Group.objects.create(title='Название группы', slug='test-group', description='')
+        posts = [Post.objects.create(text=f'Запись {i}', author=user, group=group) for i in range(5)]
+        Comment.objects.create(text='Комментарий', author=reader, post=posts[0])
+        Follow.objects.create(user=reader, author=user)
+        Post.objects.filter(pk=posts[1].pk).update(pub_date='2020-01-01 10:00:00+00:00')
+        expected = list(Post.objects.order_by('pk').values_list('pk', 'text', 'pub_date', 'group_id'))
+        call_command('export_ndjson', '--output', self.path('dump.ndjson.gz'), '--gzip')
+
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        out = StringIO()
+        call_command('import_posts', self.path('dump.ndjson.gz'), '--batch-size', '3', stdout=out)
+        self.assertIn('Загружено: post 5, comment 1, follow 1; пропущено: 0', out.getvalue())
+        # id и даты публикации сохранены
+        self.assertEqual(list(Post.objects.order_by('pk').values_list('pk', 'text', 'pub_date', 'group_id')),
+                         expected)
+        self.assertEqual(Post.objects.get(pk=posts[0].pk).comment_count, 1)
+        self.assertEqual(AuthorStats.for_user(user).posts_count, 5)
+        self.assertEqual(AuthorStats.for_user(user).followers_count, 1)
+
+        # повторный запуск ничего не дублирует и не считает загруженным
+        out = StringIO()
+        call_command('import_posts', self.path('dump.ndjson.gz'), stdout=out)
+        self.assertIn('Загружено: post 0, comment 0, follow 0; пропущено: 7', out.getvalue())
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_csv_with_missing_authors(self):
+        with open(self.path('posts.csv'), 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(['text', 'author', 'group', 'pub_date'])
+            writer.writerow(['Первая', 'Anna', 'cats', '2021-02-03T04:05:06Z'])
+            writer.writerow(['Вторая', 'Anna', '', ''])
+        call_command('import_posts', self.path('posts.csv'), stdout=StringIO())
+        # без --create-missing строки с неизвестными авторами пропускаются
+        self.assertFalse(Post.objects.exists())
+
+        call_command('import_posts', self.path('posts.csv'), '--create-missing', stdout=StringIO())
+        first = Post.objects.get(text='Первая')
+        self.assertEqual((first.author.username, first.group.slug), ('Anna', 'cats'))
+        self.assertEqual(first.pub_date.year, 2021)
+        self.assertIsNone(Post.objects.get(text='Вторая').group)
+        self.assertFalse(User.objects.get(username='Anna').has_usable_password())
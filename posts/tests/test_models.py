@@ -1,5 +1,8 @@
+from django.core.management import call_command
 from django.test import TestCase
-from posts.models import Post, Group
+from io import StringIO
+
+from posts.models import Post, Group, Comment, Follow, AuthorStats
 from django.contrib.auth import get_user_model
 
 
@@ -78,3 +81,68 @@ class PostModelTest(TestCase):
         post_str_15 = str(post)[:15]
         expected_object_name = post.text[:15]
         self.assertEquals(expected_object_name, post_str_15)
+
+
+class CommentCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='Gena')
+        cls.post = Post.objects.create(text='Тестовый текст статьи', author=cls.user)
+
+    def get_count(self):
+        return Post.objects.get(pk=CommentCountTest.post.pk).comment_count
+
+    def test_comment_count_follows_comments(self):
+        comment = Comment.objects.create(text='Первый', author=CommentCountTest.user, post=CommentCountTest.post)
+        Comment.objects.create(text='Второй', author=CommentCountTest.user, post=CommentCountTest.post)
+        self.assertEqual(self.get_count(), 2)
+        comment.delete()
+        self.assertEqual(self.get_count(), 1)
+
+    def test_version_bumps(self):
+        # версия карточки растёт от комментария и от смены имени автора
+        version = Post.objects.get(pk=CommentCountTest.post.pk).version
+        Comment.objects.create(text='Первый', author=CommentCountTest.user, post=CommentCountTest.post)
+        author = User.objects.get(pk=CommentCountTest.user.pk)
+        author.username = 'Gennady'
+        author.save()
+        self.assertEqual(Post.objects.get(pk=CommentCountTest.post.pk).version, version + 2)
+
+    def test_recount_comments_fixes_drift(self):
+        Comment.objects.create(text='Первый', author=CommentCountTest.user, post=CommentCountTest.post)
+        Post.objects.update(comment_count=10)
+        call_command('recount_comments', stdout=StringIO())
+        self.assertEqual(self.get_count(), 1)
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Gena')
+        cls.reader = User.objects.create(username='Reader')
+
+    def get_stats(self, user):
+        stats = AuthorStats.objects.get(user=user)
+        return stats.posts_count, stats.followers_count, stats.following_count
+
+    def test_stats_follow_posts_and_follows(self):
+        post = Post.objects.create(text='Первая', author=AuthorStatsTest.author)
+        Post.objects.create(text='Вторая', author=AuthorStatsTest.author)
+        Follow.objects.create(user=AuthorStatsTest.reader, author=AuthorStatsTest.author)
+        self.assertEqual(self.get_stats(AuthorStatsTest.author), (2, 1, 0))
+        self.assertEqual(self.get_stats(AuthorStatsTest.reader), (0, 0, 1))
+
+        post.delete()
+        Follow.objects.filter(user=AuthorStatsTest.reader).delete()
+        self.assertEqual(self.get_stats(AuthorStatsTest.author), (1, 0, 0))
+        self.assertEqual(self.get_stats(AuthorStatsTest.reader), (0, 0, 0))
+
+    def test_reconcile_stats_fixes_drift(self):
+        Post.objects.create(text='Первая', author=AuthorStatsTest.author)
+        AuthorStats.objects.filter(user=AuthorStatsTest.author).update(posts_count=5, followers_count=3)
+        AuthorStats.objects.filter(user=AuthorStatsTest.reader).delete()
+        call_command('reconcile_stats', stdout=StringIO())
+        self.assertEqual(self.get_stats(AuthorStatsTest.author), (1, 0, 0))
+        self.assertEqual(self.get_stats(AuthorStatsTest.reader), (0, 0, 0))
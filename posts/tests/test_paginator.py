@@ -0,0 +1,171 @@
+import re
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.models import Post, AuthorStats
+from posts.paginator import CursorPage, page_window
+
+User = get_user_model()
+
+
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.guest_client = Client()
+        cls.user = User.objects.create_user(username='StasBasov')
+        # bulk_create даёт записям почти одинаковую дату публикации,
+        # так что заодно проверяем, что при равных pub_date порядок задаёт id
+        Post.objects.bulk_create(
+            [Post(text='Тестовый текст статьи' + str(i), author=cls.user) for i in range(25)])
+        cls.expected_ids = list(Post.objects.order_by('-pub_date', '-id').values_list('id', flat=True))
+
+    def setUp(self):
+        # записи созданы bulk_create, без сигналов, которые сбросили бы
+        # закэшированные страницы ленты других тестов
+        cache.clear()
+
+    def test_cursor_walks_whole_feed(self):
+        # Идём по ленте ссылками "Следующая" и собираем все записи
+        seen = []
+        response = CursorPaginatorViewsTest.guest_client.get(reverse('index') + '?cursor=start')
+        while True:
+            page = response.context.get('page')
+            self.assertIsInstance(page, CursorPage)
+            seen.extend(post.id for post in page)
+            if not page.next_cursor:
+                break
+            response = CursorPaginatorViewsTest.guest_client.get(
+                reverse('index') + '?cursor=' + page.next_cursor)
+        self.assertEqual(seen, CursorPaginatorViewsTest.expected_ids)
+
+    def get_link(self, response, title):
+        links = re.findall(r'<a class="page-link" href="([^"]+)">' + title, response.content.decode())
+        self.assertEqual(len(links), 1)
+        return reverse('index') + links[0]
+
+    def test_numbered_page_links_to_cursor(self):
+        response = CursorPaginatorViewsTest.guest_client.get(reverse('index') + '?page=2')
+        self.assertIn('page=3', response.content.decode())
+        next_url = self.get_link(response, 'Следующая')
+        self.assertIn('?cursor=', next_url)
+        # переход по ссылке "Следующая" - страница по курсору, без COUNT(*)
+        with self.assertNumQueries(2):
+            page = CursorPaginatorViewsTest.guest_client.get(next_url).context['page']
+        self.assertIsInstance(page, CursorPage)
+        self.assertEqual([post.id for post in page], CursorPaginatorViewsTest.expected_ids[20:])
+
+        previous_url = self.get_link(response, '&laquo; Предыдущая')
+        page = CursorPaginatorViewsTest.guest_client.get(previous_url).context['page']
+        self.assertEqual([post.id for post in page], CursorPaginatorViewsTest.expected_ids[:10])
+
+    def test_cursor_previous_page(self):
+        first = CursorPaginatorViewsTest.guest_client.get(reverse('index') + '?cursor=start').context['page']
+        second = CursorPaginatorViewsTest.guest_client.get(
+            reverse('index') + '?cursor=' + first.next_cursor).context['page']
+        back = CursorPaginatorViewsTest.guest_client.get(
+            reverse('index') + '?cursor=' + second.previous_cursor).context['page']
+        self.assertEqual([post.id for post in back], [post.id for post in first])
+        self.assertFalse(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_cursor_does_not_count(self):
+        # Страница по курсору - это один запрос с LIMIT, без COUNT(*)
+        first = CursorPaginatorViewsTest.guest_client.get(reverse('index') + '?cursor=start').context['page']
+        paginator = first.paginator
+        with self.assertNumQueries(1):
+            page = paginator.get_page(first.next_cursor)
+            self.assertEqual(len(page), 10)
+
+    def test_page_number_still_works(self):
+        response = CursorPaginatorViewsTest.guest_client.get(
+            reverse('profile', kwargs={'username': 'StasBasov'}) + '?page=3')
+        page = response.context.get('page')
+        self.assertEqual(page.number, 3)
+        self.assertEqual([post.id for post in page], CursorPaginatorViewsTest.expected_ids[20:])
+
+
+class PageWindowTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.guest_client = Client()
+        cls.user = User.objects.create_user(username='StasBasov')
+        Post.objects.bulk_create(
+            [Post(text='Тестовый текст статьи' + str(i), author=cls.user) for i in range(120)])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_window(self):
+        paginator = Paginator(range(5000 * 10), 10)
+        self.assertEqual(page_window(paginator.page(50)), [1, None, 48, 49, 50, 51, 52, None, 5000])
+        self.assertEqual(page_window(paginator.page(1)), [1, 2, 3, None, 5000])
+        # пропуск из одной страницы заменяется её номером
+        self.assertEqual(page_window(paginator.page(4)), [1, 2, 3, 4, 5, 6, None, 5000])
+        self.assertEqual(page_window(Paginator(range(5), 10).page(1)), [1])
+
+    def test_links_around_current_page(self):
+        response = PageWindowTest.guest_client.get(reverse('index') + '?page=6')
+        content = response.content.decode()
+        pages = [number for number in range(1, 13) if f'?page={number}"' in content]
+        self.assertEqual(pages, [1, 4, 5, 7, 8, 12])
+        self.assertEqual(content.count('&hellip;'), 2)
+
+
+class CachedCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='StasBasov')
+        # вошедшим пользователям страницы не отдаются из кэша целиком
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    def setUp(self):
+        cache.clear()
+        for i in range(10):
+            Post.objects.create(text='Тестовый текст статьи' + str(i), author=CachedCountTest.user)
+
+    def get(self, url):
+        return CachedCountTest.authorized_client.get(url).context['paginator']
+
+    def test_count_cached_until_feed_changes(self):
+        self.assertEqual(self.get(reverse('index')).count, 10)
+        # версии страницы, сессия, пользователь и записи, без COUNT(*)
+        with self.assertNumQueries(4):
+            self.get(reverse('index'))
+        Post.objects.create(text='Новая запись', author=CachedCountTest.user)
+        self.assertEqual(self.get(reverse('index')).count, 11)
+
+    def test_large_feed_count_is_approximate(self):
+        with patch('posts.paginator.COUNT_APPROXIMATE_FROM', 5):
+            self.assertEqual(self.get(reverse('index')).count, 10)
+            Post.objects.create(text='Новая запись', author=CachedCountTest.user)
+            # большая лента пересчитывается только по истечении времени
+            self.assertEqual(self.get(reverse('index')).count, 10)
+
+    def test_profile_uses_stored_count_for_large_feeds(self):
+        AuthorStats.objects.filter(user=CachedCountTest.user).update(posts_count=25)
+        url = reverse('profile', kwargs={'username': 'StasBasov'})
+        # небольшая лента считается по таблице
+        self.assertEqual(self.get(url).count, 10)
+        with patch('posts.paginator.COUNT_APPROXIMATE_FROM', 5):
+            self.assertEqual(self.get(url).count, 25)
+
+    def test_stale_stored_count_keeps_oldest_posts(self):
+        for i in range(10):
+            Post.objects.create(text='Ещё запись' + str(i), author=CachedCountTest.user)
+        # счётчик отстал: по нему записей на одну страницу
+        AuthorStats.objects.filter(user=CachedCountTest.user).update(posts_count=8)
+        with patch('posts.paginator.COUNT_APPROXIMATE_FROM', 5):
+            response = CachedCountTest.authorized_client.get(
+                reverse('profile', kwargs={'username': 'StasBasov'}) + '?page=2')
+        self.assertEqual(response.context['paginator'].count, 20)
+        self.assertEqual(response.context['page'].number, 2)
+        self.assertEqual(len(response.context['page']), 10)
@@ -0,0 +1,79 @@
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post, Group, Follow, Comment
+from posts.paginator import NEXT, PREVIOUS, encode_cursor
+
+User = get_user_model()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'планы запросов SQLite')
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(title='Название группы',
+                                         slug='test-group',
+                                         description='Описание группы')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.reader)
+        cls.author = User.objects.create_user(username='Gena')
+        for i in range(15):
+            cls.post = Post.objects.create(text=f'Тестовый текст статьи {i}',
+                                           author=cls.author,
+                                           group=cls.group)
+            Comment.objects.create(text='Комментарий', author=cls.reader, post=cls.post)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        # из кэша карточки не читают базу, и часть запросов не попала бы в план
+        cache.clear()
+
+    def assertNoTempSort(self, url):
+        """Ни один SELECT страницы не сортирует выборку во временном B-дереве."""
+        with CaptureQueriesContext(connection) as queries:
+            response = QueryPlanTest.authorized_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plan = [row[-1] for row in cursor.fetchall()]
+                self.assertFalse(any('TEMP B-TREE' in step for step in plan),
+                                 f'{url}: {query["sql"]}\n{plan}')
+        return response
+
+    def test_index(self):
+        self.assertNoTempSort(reverse('index'))
+        self.assertNoTempSort(reverse('index') + '?page=2')
+
+    def test_index_cursor(self):
+        post = Post.objects.order_by('pub_date', 'id')[7]
+        for direction in (NEXT, PREVIOUS):
+            self.assertNoTempSort(reverse('index') + '?cursor=' + encode_cursor(post, direction))
+
+    def test_group(self):
+        self.assertNoTempSort(reverse('group_posts', kwargs={'slug': 'test-group'}))
+
+    def test_profile(self):
+        self.assertNoTempSort(reverse('profile', kwargs={'username': 'Gena'}))
+
+    def test_post(self):
+        self.assertNoTempSort(reverse('post', kwargs={'username': 'Gena', 'post_id': QueryPlanTest.post.pk}))
+
+    # В стратегии join записи нескольких авторов приходится сливать
+    # сортировкой, без неё ленту отдаёт только разложенная заранее лента
+    @override_settings(FOLLOW_FEED_STRATEGY='fanout')
+    def test_follow_fanout(self):
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertNoTempSort(reverse('follow_index'))
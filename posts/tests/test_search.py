@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.guest_client = Client()
+        cls.user = User.objects.create_user(username='Gena')
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query, **params):
+        response = SearchTest.guest_client.get(reverse('search'), {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_finds_posts_by_words(self):
+        post = Post.objects.create(text='Рецепт борща со сметаной', author=SearchTest.user)
+        Post.objects.create(text='Рецепт пирога', author=SearchTest.user)
+        response = self.search('борща рецепт')
+        self.assertEqual(list(response.context['page']), [post])
+        self.assertContains(response, 'Рецепт борща со сметаной')
+
+    def test_ranked_by_relevance(self):
+        rare = Post.objects.create(text='Кот ' + 'и собака ' * 30, author=SearchTest.user)
+        often = Post.objects.create(text='Кот, кот и ещё раз кот', author=SearchTest.user)
+        # более свежая запись rare ниже: в ней слово встречается реже
+        Post.objects.filter(pk=rare.pk).update(pub_date=often.pub_date.replace(year=often.pub_date.year + 1))
+        self.assertEqual(list(self.search('кот').context['page']), [often, rare])
+
+    def test_index_follows_edit_and_delete(self):
+        post = Post.objects.create(text='Старый текст', author=SearchTest.user)
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(list(self.search('старый').context['page']), [])
+        self.assertEqual(list(self.search('новый').context['page']), [post])
+        post.delete()
+        self.assertEqual(list(self.search('новый').context['page']), [])
+
+    def test_query_syntax_is_escaped(self):
+        Post.objects.create(text='Текст "в кавычках" и NEAR', author=SearchTest.user)
+        for query in ['"в', 'NEAR(', 'text:кавычках', '*', 'AND OR']:
+            self.search(query)
+        self.assertEqual(len(self.search('"в кавычках"').context['page']), 1)
+
+    def test_empty_query(self):
+        Post.objects.create(text='Текст', author=SearchTest.user)
+        response = self.search('  ')
+        self.assertEqual(response.context['paginator'].count, 0)
+
+    def test_pages_keep_query(self):
+        Post.objects.bulk_create([Post(text=f'Заметка {i}', author=SearchTest.user) for i in range(12)])
+        response = self.search('заметка')
+        self.assertEqual(response.context['paginator'].count, 12)
+        self.assertContains(response, '?q=%D0%B7%D0%B0%D0%BC%D0%B5%D1%82%D0%BA%D0%B0&amp;page=2')
+        self.assertEqual(len(self.search('заметка', page=2).context['page']), 2)
@@ -0,0 +1,60 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.db import connection, connections, transaction
+from django.test import TransactionTestCase
+
+ALIAS = 'sqlite_backend_test'
+
+
+class SQLiteBackendTest(TransactionTestCase):
+    # отдельная база в своём файле, доступ к ней разрешён только этим тестам
+    databases = {ALIAS}
+
+    @classmethod
+    def setUpClass(cls):
+        # база должна быть известна до super(): там проверяется databases
+        cls.directory = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.directory, 'db.sqlite3')
+        connections.databases[ALIAS] = {
+            **connection.settings_dict,
+            'ENGINE': 'yatube.sqlite_backend',
+            'NAME': cls.path,
+            'OPTIONS': {'timeout': 3, 'pragmas': {'cache_size': -1024}},
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[ALIAS].close()
+        # соединение кэшируется в потоке, уберём его вместе с настройками
+        del connections[ALIAS]
+        connections.databases.pop(ALIAS)
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def pragma(self, name):
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        # 1 - NORMAL
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 3000)
+        # значение из OPTIONS заменяет стандартное
+        self.assertEqual(self.pragma('cache_size'), -1024)
+
+    def test_atomic_takes_write_lock_at_begin(self):
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute('CREATE TABLE IF NOT EXISTS item (id INTEGER PRIMARY KEY)')
+        other = sqlite3.connect(self.path, timeout=0)
+        self.addCleanup(other.close)
+        with transaction.atomic(using=ALIAS):
+            # транзакция ещё ничего не записала, но право на запись уже у неё
+            with self.assertRaisesMessage(sqlite3.OperationalError, 'locked'):
+                other.execute('INSERT INTO item DEFAULT VALUES')
+        other.execute('INSERT INTO item DEFAULT VALUES')
@@ -0,0 +1,116 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import storage, thumbnails
+from posts.models import Post, ReleasedImage
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ContentAddressedStorageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Gena')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(os.path.join(MEDIA_ROOT, 'posts'), ignore_errors=True)
+
+    @staticmethod
+    def get_image_file(name, color=(200, 0, 0)):
+        file_obj = BytesIO()
+        Image.new('RGB', (60, 40), color=color).save(file_obj, 'png')
+        return SimpleUploadedFile(name, file_obj.getvalue(), content_type='image/png')
+
+    def create_post(self, image):
+        return Post.objects.create(text='Мем', author=ContentAddressedStorageTest.user, image=image)
+
+    def files(self):
+        return sorted(os.path.relpath(os.path.join(root, name), MEDIA_ROOT)
+                      for root, _, names in os.walk(os.path.join(MEDIA_ROOT, 'posts')) for name in names)
+
+    def test_same_content_is_stored_once(self):
+        first = self.create_post(self.get_image_file('meme.PNG'))
+        second = self.create_post(self.get_image_file('repost.png'))
+        other = self.create_post(self.get_image_file('meme.png', color=(0, 200, 0)))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        directory, filename = os.path.split(first.image.name)
+        self.assertEqual(directory, 'posts/' + filename[:2])
+        self.assertTrue(filename.endswith('.png'))
+        self.assertEqual(len(self.files()), 2)
+
+    def test_file_is_deleted_with_last_post(self):
+        first = self.create_post(self.get_image_file('meme.png'))
+        second = self.create_post(self.get_image_file('meme.png'))
+        thumbnails.build(first.image)
+        thumbnail = thumbnails.get_prebuilt(first.image, 'card')
+
+        first.delete()
+        self.assertEqual(storage.purge(timedelta(0)), 0)
+        self.assertTrue(second.image.storage.exists(second.image.name))
+        self.assertTrue(thumbnail.exists())
+
+        second.delete()
+        # до конца срока файл не трогаем
+        call_command('purge_images', stdout=StringIO())
+        self.assertTrue(second.image.storage.exists(second.image.name))
+        out = StringIO()
+        call_command('purge_images', '--grace-hours', '0', stdout=out)
+        self.assertIn('Удалено файлов: 1', out.getvalue())
+        self.assertFalse(second.image.storage.exists(second.image.name))
+        self.assertFalse(thumbnail.exists())
+        self.assertFalse(ReleasedImage.objects.exists())
+
+    def test_upload_cancels_release(self):
+        post = self.create_post(self.get_image_file('meme.png'))
+        name = post.image.name
+        post.delete()
+        self.assertTrue(ReleasedImage.objects.filter(name=name).exists())
+        # то же содержимое загрузили снова, а запись ещё не сохранена
+        self.assertEqual(Post.image.field.storage.save('posts/again.png', self.get_image_file('again.png')), name)
+        self.assertFalse(ReleasedImage.objects.exists())
+        storage.purge(timedelta(0))
+        self.assertTrue(Post.image.field.storage.exists(name))
+
+    def test_upload_after_purge_writes_file_again(self):
+        post = self.create_post(self.get_image_file('meme.png'))
+        name = post.image.name
+        post.delete()
+        storage.purge(timedelta(0))
+        self.assertFalse(Post.image.field.storage.exists(name))
+        self.create_post(self.get_image_file('meme.png'))
+        self.assertTrue(Post.image.field.storage.exists(name))
+
+    def test_replaced_image_is_released(self):
+        post = self.create_post(self.get_image_file('old.png'))
+        old_name = post.image.name
+        ContentAddressedStorageTest.authorized_client.post(
+            reverse('post_edit', args=['Gena', post.pk]),
+            data={'text': 'Мем', 'image': self.get_image_file('new.png', color=(0, 0, 200))})
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, old_name)
+        storage.purge(timedelta(0))
+        self.assertEqual(self.files(), [post.image.name])
@@ -0,0 +1,160 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import thumbnails
+from posts.models import Post, ThumbnailTask
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ThumbnailPipelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Gena')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        # после отката транзакции id записей повторяются, а карточки
+        # других тестов под теми же ключами могли остаться в кэше
+        cache.clear()
+
+    @staticmethod
+    def get_image_file(name, color=(200, 0, 0)):
+        file_obj = BytesIO()
+        Image.new('RGB', (1200, 800), color=color).save(file_obj, 'png')
+        return SimpleUploadedFile(name, file_obj.getvalue(), content_type='image/png')
+
+    def test_new_post_is_queued_and_built(self):
+        ThumbnailPipelineTest.authorized_client.post(
+            reverse('new_post'),
+            data={'text': 'Запись с картинкой', 'image': self.get_image_file('photo.png')})
+        post = Post.objects.get(text='Запись с картинкой')
+        self.assertTrue(ThumbnailTask.objects.filter(post=post).exists())
+        # пока миниатюры нет, карточка ссылается на исходный файл
+        self.assertIsNone(thumbnails.get_prebuilt(post.image, 'card'))
+        response = ThumbnailPipelineTest.authorized_client.get(reverse('index'))
+        self.assertContains(response, post.image.url)
+
+        call_command('thumbnail_worker', '--once', '--threads', '1', stdout=StringIO())
+        self.assertFalse(ThumbnailTask.objects.exists())
+        thumbnail = thumbnails.get_prebuilt(post.image, 'card')
+        self.assertIsNotNone(thumbnail)
+        self.assertEqual((thumbnail.width, thumbnail.height), (960, 339))
+        # версия выросла, и карточка перерисована уже с миниатюрой
+        response = ThumbnailPipelineTest.authorized_client.get(reverse('index'))
+        self.assertContains(response, thumbnail.url)
+
+    def test_failed_task_is_retried(self):
+        post = Post.objects.create(text='Запись', author=ThumbnailPipelineTest.user,
+                                   image=self.get_image_file('photo.png'))
+        thumbnails.schedule(post)
+        with patch('posts.thumbnails.get_thumbnail', side_effect=OSError):
+            for _ in range(thumbnails.MAX_ATTEMPTS + 1):
+                call_command('thumbnail_worker', '--once', '--threads', '1', stdout=StringIO())
+        # задача не потеряна, но worker её больше не берёт
+        self.assertEqual(ThumbnailTask.objects.get(post=post).attempts, thumbnails.MAX_ATTEMPTS)
+        self.assertFalse(thumbnails.is_built(post.image))
+        # новая картинка сбрасывает счётчик
+        post.image = self.get_image_file('other.png', color=(0, 200, 0))
+        post.save()
+        thumbnails.schedule(post)
+        call_command('thumbnail_worker', '--once', '--threads', '1', stdout=StringIO())
+        self.assertFalse(ThumbnailTask.objects.exists())
+
+    def test_image_replaced_during_build_stays_queued(self):
+        post = Post.objects.create(text='Запись', author=ThumbnailPipelineTest.user,
+                                   image=self.get_image_file('photo.png'))
+        thumbnails.schedule(post)
+        build_post = thumbnails.build_post
+
+        old_image = post.image.name
+
+        def replace_and_build(post_id):
+            built = build_post(post_id)
+            if post.image.name == old_image:
+                # пока строилась старая картинка, автор загрузил новую
+                post.image = self.get_image_file('new.png', color=(0, 0, 200))
+                post.save()
+                thumbnails.schedule(post)
+            return built
+
+        with patch('posts.thumbnails.build_post', replace_and_build):
+            out = StringIO()
+            call_command('thumbnail_worker', '--once', '--threads', '1', stdout=out)
+        # задача осталась в очереди и во втором проходе построила новую картинку
+        self.assertEqual(out.getvalue().count('Записей: 1'), 2)
+        self.assertFalse(ThumbnailTask.objects.exists())
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, old_image)
+        self.assertTrue(thumbnails.is_built(post.image))
+
+    def test_post_without_image_is_not_queued(self):
+        ThumbnailPipelineTest.authorized_client.post(reverse('new_post'), data={'text': 'Без картинки'})
+        self.assertFalse(ThumbnailTask.objects.exists())
+
+    def test_warm_thumbnails_builds_and_skips_ready(self):
+        post = Post.objects.create(text='Старая запись', author=ThumbnailPipelineTest.user,
+                                   image=self.get_image_file('old.png'))
+        Post.objects.create(text='Файл потерян', author=ThumbnailPipelineTest.user,
+                            image='posts/lost.png')
+        # анонимная страница и карточка на ней попадают в кэш
+        guest_client = Client()
+        self.assertContains(guest_client.get(reverse('index')), post.image.url)
+        out = StringIO()
+        call_command('warm_thumbnails', '--processes', '1', stdout=out)
+        self.assertTrue(thumbnails.is_built(post.image))
+        # закэшированные страница и карточка с исходной картинкой обновлены
+        self.assertContains(guest_client.get(reverse('index')),
+                            thumbnails.get_prebuilt(post.image, 'card').url)
+        self.assertIn('построено 1, готово ранее 0, нет файла 1', out.getvalue())
+
+        out = StringIO()
+        call_command('warm_thumbnails', '--processes', '1', stdout=out)
+        self.assertIn('построено 0, готово ранее 1, нет файла 1', out.getvalue())
+        # продолжение после прерывания: записи до --after не просматриваются
+        out = StringIO()
+        call_command('warm_thumbnails', '--processes', '1', '--after', str(post.pk), stdout=out)
+        self.assertIn('1/1 записей', out.getvalue())
+
+    def test_card_is_responsive_picture(self):
+        ThumbnailPipelineTest.authorized_client.post(
+            reverse('new_post'),
+            data={'text': 'Запись с картинкой', 'image': self.get_image_file('photo.png')})
+        post = Post.objects.get(text='Запись с картинкой')
+        # до построения миниатюр - исходный файл с размерами из записи
+        response = ThumbnailPipelineTest.authorized_client.get(reverse('index'))
+        self.assertContains(response, 'width="1200" height="800"')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertNotContains(response, '<picture>')
+
+        call_command('thumbnail_worker', '--once', '--threads', '1', stdout=StringIO())
+        response = ThumbnailPipelineTest.authorized_client.get(reverse('index'))
+        self.assertContains(response, '<picture>')
+        self.assertContains(response, 'width="960" height="339"')
+        # оригинал шириной 1200 пикселей, крупный вариант не растягивается
+        for size, width in (('card_480', 480), ('card', 960), ('card_1440', 1200)):
+            self.assertContains(response, f'{thumbnails.get_prebuilt(post.image, size).url} {width}w')
+            webp = thumbnails.get_prebuilt(post.image, size + thumbnails.WEBP)
+            self.assertTrue(webp.url.endswith('.webp'))
+            self.assertContains(response, f'{webp.url} {width}w')
+        self.assertContains(response, '<source type="image/webp"')
@@ -0,0 +1,95 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts.models import Post, Follow, TimelineEntry
+
+User = get_user_model()
+
+
+@override_settings(FOLLOW_FEED_STRATEGY='fanout')
+class FanoutTimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Gena')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+
+    def get_feed_texts(self):
+        response = FanoutTimelineTest.reader_client.get(reverse('follow_index'))
+        return [post.text for post in response.context['page']]
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        Post.objects.create(text='Старая запись', author=FanoutTimelineTest.author)
+        FanoutTimelineTest.reader_client.get(reverse('profile_follow', kwargs={'username': 'Gena'}))
+        self.assertEqual(TimelineEntry.objects.filter(user=FanoutTimelineTest.reader).count(), 1)
+        self.assertEqual(self.get_feed_texts(), ['Старая запись'])
+
+        FanoutTimelineTest.reader_client.get(reverse('profile_unfollow', kwargs={'username': 'Gena'}))
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.get_feed_texts(), [])
+
+    def test_new_post_fans_out(self):
+        Follow.objects.create(user=FanoutTimelineTest.reader, author=FanoutTimelineTest.author)
+        FanoutTimelineTest.author_client.post(reverse('new_post'), data={'text': 'Новая запись'})
+        Post.objects.create(text='Ещё одна запись', author=FanoutTimelineTest.author)
+        self.assertEqual(self.get_feed_texts(), ['Ещё одна запись', 'Новая запись'])
+
+    def test_rebuild_timelines(self):
+        with override_settings(FOLLOW_FEED_STRATEGY='join'):
+            Follow.objects.create(user=FanoutTimelineTest.reader, author=FanoutTimelineTest.author)
+            Post.objects.create(text='Запись до включения', author=FanoutTimelineTest.author)
+        self.assertEqual(self.get_feed_texts(), [])
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.get_feed_texts(), ['Запись до включения'])
+
+
+@override_settings(FOLLOW_FEED_STRATEGY='hybrid', FOLLOW_FEED_CELEBRITY_FOLLOWERS=1)
+class HybridTimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Gena')
+        cls.celebrity = User.objects.create_user(username='Star')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.fan = User.objects.create_user(username='Fan')
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+        # у Star два подписчика - больше порога, её записи не раскладываются
+        Follow.objects.create(user=cls.fan, author=cls.celebrity)
+        Follow.objects.create(user=cls.reader, author=cls.celebrity)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def test_celebrity_posts_are_pulled(self):
+        Post.objects.create(text='Запись обычного автора', author=HybridTimelineTest.author)
+        Post.objects.create(text='Запись знаменитости', author=HybridTimelineTest.celebrity)
+        # в ленту разложена только запись обычного автора
+        self.assertEqual(list(TimelineEntry.objects.values_list('post__text', flat=True)),
+                         ['Запись обычного автора'])
+        response = HybridTimelineTest.reader_client.get(reverse('follow_index'))
+        self.assertEqual([post.text for post in response.context['page']],
+                         ['Запись знаменитости', 'Запись обычного автора'])
+
+    def test_unfollow_celebrity(self):
+        Post.objects.create(text='Запись знаменитости', author=HybridTimelineTest.celebrity)
+        Follow.objects.filter(user=HybridTimelineTest.fan).delete()
+        Follow.objects.filter(user=HybridTimelineTest.reader, author=HybridTimelineTest.celebrity).delete()
+        response = HybridTimelineTest.reader_client.get(reverse('follow_index'))
+        self.assertEqual(len(response.context['page']), 0)
+
+    @override_settings(FOLLOW_FEED_HYBRID_DEPTH=3)
+    def test_hybrid_feed_is_capped(self):
+        for i in range(3):
+            Post.objects.create(text=f'Автор {i}', author=HybridTimelineTest.author)
+            Post.objects.create(text=f'Знаменитость {i}', author=HybridTimelineTest.celebrity)
+        response = HybridTimelineTest.reader_client.get(reverse('follow_index'))
+        # из обоих источников - только три самые свежие записи
+        self.assertEqual([post.text for post in response.context['page']],
+                         ['Знаменитость 2', 'Автор 2', 'Знаменитость 1'])
@@ -3,11 +3,15 @@ from django.contrib.auth import get_user_model
 from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import SimpleUploadedFile
 import shutil
 import tempfile
 
-from posts.models import Post, Group, Follow
+from posts.models import Post, Group, Follow, Comment
+from posts.storage import content_name
 
 User = get_user_model()
 
@@ -36,6 +40,8 @@ class PostViewsTests(TestCase):
             content=cls.small_gif,
             content_type='image/gif'
         )
+        # картинки хранятся под именем по содержимому, см. posts/storage.py
+        cls.image_name = content_name('posts/small.gif', ContentFile(cls.small_gif))
         # Создаем неавторизованный клиент
         cls.guest_client = Client()
         # Создаем пользователя
@@ -93,18 +99,25 @@ class PostViewsTests(TestCase):
         post_image_1 = response.context.get('page')[1].image
         post_text_1 = response.context.get('page')[1].text
         self.assertEqual(post_text_0, 'Тестовый текст статьи c группой')
-        self.assertEqual(post_image_1.name, 'posts/small.gif')
+        self.assertEqual(post_image_1.name, PostViewsTests.image_name)
         self.assertEqual(post_text_1, 'Тестовый текст статьи')
 
     # Проверка работы кэша главной страницы
     def test_home_page_cache(self):
-
+        # Карточки записей кэшируются по id и версии записи,
+        # поэтому правка записи видна на главной сразу
+        cache.clear()
+        PostViewsTests.authorized_client.get(reverse('index'))
+        post = Post.objects.get(pk=PostViewsTests.post.pk)
+        key = make_template_fragment_key('post_card', [post.id, post.version])
+        self.assertIsNotNone(cache.get(key), 'Кэш не работает')
+
+        PostViewsTests.authorized_client.post(
+            reverse('post_edit', kwargs={'username': 'Gena', 'post_id': post.id}),
+            data={'text': 'Исправленный текст статьи'})
+        self.assertEqual(Post.objects.get(pk=post.pk).version, post.version + 1)
         response = PostViewsTests.authorized_client.get(reverse('index'))
-        response_content = response.content
-        Post.objects.create(text='Эта статья появится через 20 с',
-                            author=PostViewsTests.user_1)
-        response_new = PostViewsTests.authorized_client.get(reverse('index'))
-        self.assertEqual(response_content, response_new.content, 'Кэш не работает')
+        self.assertContains(response, 'Исправленный текст статьи')
 
     # Проверяем, что словарь context страницы группы
     # содержит ожидаемые значения
@@ -137,7 +150,8 @@ class PostViewsTests(TestCase):
         post_group_text_0 = response.context.get('page')[0].text
         post_group_image_0 = response.context.get('page')[0].image
         self.assertEqual(post_group_text_0, 'Тестовый текст статьи c группой', 'Пост не появился в группе')
-        self.assertEqual(post_group_image_0.name, 'posts/image_group.gif')
+        self.assertEqual(post_group_image_0.name,
+                         content_name('posts/image_group.gif', ContentFile(image_group)))
 
     # Проверяем словарь context профиля пользователя
     def test_profile_page_show_correct_context(self):
@@ -146,7 +160,7 @@ class PostViewsTests(TestCase):
         prolile_text_0 = response.context.get('page')[0].text
         prolile_image_0 = response.context.get('page')[0].image
         self.assertEqual(prolile_text_0, 'Тестовый текст статьи')
-        self.assertEqual(prolile_image_0.name, 'posts/small.gif')
+        self.assertEqual(prolile_image_0.name, PostViewsTests.image_name)
 
     # Проверяем словарь context поста пользователя
     def test_post_profile_page_show_correct_context(self):
@@ -155,7 +169,7 @@ class PostViewsTests(TestCase):
         prolile_post_text = response.context.get('post').text
         prolile_post_image = response.context.get('post').image
         self.assertEqual(prolile_post_text, 'Тестовый текст статьи')
-        self.assertEqual(prolile_post_image.name, 'posts/small.gif')
+        self.assertEqual(prolile_post_image.name, PostViewsTests.image_name)
 
     # Проверяем словарь context редактирования поста пользователя
     # тест создания нового поста
@@ -235,7 +249,7 @@ class PostViewsTests(TestCase):
         # проверим текст статьи
         self.assertEqual(post_text_0, 'Тестовый текст статьи')
         # проверим что картинка тоже есть
-        self.assertEqual(post_image_0.name, 'posts/small.gif', 'Проверить что в ленту передаются картинки')
+        self.assertEqual(post_image_0.name, PostViewsTests.image_name, 'Проверить что в ленту передаются картинки')
         # отпишемся
         PostViewsTests.authorized_client_1.post(reverse('profile_unfollow',
                                                         kwargs={'username': 'Gena'}))
@@ -247,6 +261,9 @@ class PostViewsTests(TestCase):
 
 class PaginatorViewsTest(TestCase):
     def setUp(self):
+        # bulk_create не вызывает сигналы, и страница ленты из кэша
+        # (от предыдущего теста) не узнала бы о новых записях
+        cache.clear()
         # Создаём неавторизованный клиент
         self.guest_client = Client()
         # Создаём авторизованный клиент
@@ -265,3 +282,48 @@ class PaginatorViewsTest(TestCase):
         # Проверка: на второй странице должно быть три поста.
         response = self.client.get(reverse('index') + '?page=2')
         self.assertEqual(len(response.context.get('page').object_list), 3)
+
+
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.guest_client = Client()
+        cls.group = Group.objects.create(title='Название группы',
+                                         slug='test-group',
+                                         description='Описание группы')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.reader)
+        # у каждой записи свой автор, чтобы ленивая загрузка автора
+        # давала отдельный запрос на каждую карточку
+        for i in range(12):
+            author = User.objects.create_user(username=f'Author{i}')
+            post = Post.objects.create(text=f'Тестовый текст статьи {i}',
+                                       author=author,
+                                       group=cls.group)
+            Comment.objects.create(text='Комментарий', author=cls.reader, post=post)
+            Follow.objects.create(user=cls.reader, author=author)
+
+    def setUp(self):
+        # карточки из кэша не обращались бы к связанным объектам вовсе
+        cache.clear()
+
+    # Число запросов на страницу ленты не зависит от количества карточек:
+    # версии страницы (posts/freshness.py), COUNT(*) для паджинатора
+    # и одна выборка записей вместе с авторами, группами и числом комментариев
+    def test_index_queries(self):
+        with self.assertNumQueries(3):
+            response = FeedQueriesTest.guest_client.get(reverse('index'))
+        self.assertEqual(len(response.context['page']), 10)
+        self.assertContains(response, 'Комментариев: 1', count=10)
+
+    def test_group_queries(self):
+        # + запрос самой группы
+        with self.assertNumQueries(4):
+            FeedQueriesTest.guest_client.get(reverse('group_posts', kwargs={'slug': 'test-group'}))
+
+    def test_follow_queries(self):
+        # + сессия и пользователь
+        with self.assertNumQueries(4):
+            FeedQueriesTest.authorized_client.get(reverse('follow_index'))
@@ -0,0 +1,154 @@
+"""Заранее подготовленные миниатюры картинок к записям.
+
+Тег {% thumbnail %} из sorl при первом показе новой картинки открывает
+оригинал и уменьшает его прямо во время запроса. Здесь миниатюры всех
+стандартных размеров строятся в фоне: new_post и post_edit ставят
+запись в очередь ThumbnailTask, а команда thumbnail_worker разбирает
+очередь пулом потоков. Шаблоны показывают только готовые миниатюры
+(тег post_picture), пока их нет - картинку в исходном виде. Карточка
+строится в нескольких ширинах для srcset, каждая ещё и в WebP: телефон
+получает файл в 480 пикселей вместо 960, а браузеры с поддержкой
+WebP - файл в полтора-два раза меньше JPEG.
+Для уже загруженных картинок (например, после добавления нового
+размера в SIZES) есть команда warm_thumbnails.
+"""
+import logging
+
+from django.db.models import F
+from sorl.thumbnail import default, delete as sorl_delete, get_thumbnail
+from sorl.thumbnail.helpers import serialize, tokey
+from sorl.thumbnail.images import ImageFile
+
+from . import freshness
+from .models import Post, ThumbnailTask
+
+logger = logging.getLogger(__name__)
+
+CARD = {'crop': 'center', 'upscale': True}
+CARD_WEBP = dict(CARD, format='WEBP')
+# Крупный вариант только для чётких экранов: маленький оригинал
+# не растягиваем, миниатюра будет шириной с него
+CARD_LARGE = dict(CARD, upscale=False)
+CARD_LARGE_WEBP = dict(CARD_LARGE, format='WEBP')
+
+# Стандартные размеры: имя -> (геометрия, параметры sorl)
+SIZES = {
+    'card': ('960x339', CARD),
+    'card_480': ('480x170', CARD),
+    'card_1440': ('1440x508', CARD_LARGE),
+    'card_webp': ('960x339', CARD_WEBP),
+    'card_480_webp': ('480x170', CARD_WEBP),
+    'card_1440_webp': ('1440x508', CARD_LARGE_WEBP),
+}
+
+# Варианты для <picture>: основной размер -> все его ширины;
+# у каждого варианта есть пара в WebP с суффиксом WEBP
+PICTURES = {
+    'card': ('card_480', 'card', 'card_1440'),
+}
+WEBP = '_webp'
+
+
+# После стольких неудачных попыток задача остаётся в очереди, но worker
+# её больше не берёт; повторная загрузка картинки сбрасывает счётчик
+MAX_ATTEMPTS = 3
+
+
+class Prebuilt(ImageFile):
+    """Миниатюра в хранилище ключей sorl под ключом "картинка + размер".
+
+    Сам sorl хранит миниатюру под ключом от её имени, которое знает
+    только get_thumbnail. build() кладёт каждую миниатюру ещё и под
+    этим ключом, так что get_prebuilt находит её одним чтением,
+    не открывая исходный файл.
+    """
+    def __init__(self, image, size, thumbnail=None):
+        super().__init__(thumbnail or image, default.storage)
+        if thumbnail is not None:
+            self.set_size(thumbnail.size)
+        geometry, options = SIZES[size]
+        self.prebuilt_key = tokey(ImageFile(image).key, geometry, serialize(options))
+
+    @property
+    def key(self):
+        return self.prebuilt_key
+
+
+def get_prebuilt(image, size):
+    """Готовая миниатюра размера size из SIZES или None."""
+    return default.kvstore.get(Prebuilt(image, size))
+
+
+def is_built(image):
+    return all(get_prebuilt(image, size) for size in SIZES)
+
+
+def schedule(post):
+    """Ставит запись в очередь на построение миниатюр.
+
+    Задача помнит имя картинки: если картинку заменят, пока worker
+    строит старую, задача останется в очереди и для новой.
+    """
+    if not post.image:
+        return
+    tasks = ThumbnailTask.objects.filter(post=post)
+    if not tasks.update(image=post.image.name, attempts=0):
+        ThumbnailTask.objects.bulk_create([ThumbnailTask(post=post, image=post.image.name)],
+                                          ignore_conflicts=True)
+
+
+def build(image):
+    """Строит все стандартные размеры для картинки записи (FieldFile)."""
+    for size, (geometry, options) in SIZES.items():
+        thumbnail = get_thumbnail(image, geometry, **options)
+        default.kvstore.set(Prebuilt(image, size, thumbnail))
+
+
+def delete(image):
+    """Удаляет файл картинки вместе с миниатюрами и их ключами."""
+    for size in SIZES:
+        default.kvstore.delete(Prebuilt(image, size), delete_thumbnails=False)
+    sorl_delete(image)
+
+
+def build_post(post_id):
+    """Строит миниатюры записи и обновляет её карточку в кэше.
+
+    Возвращает False, если построить не удалось: задачу надо повторить.
+    """
+    try:
+        post = Post.objects.filter(pk=post_id).only('image').first()
+        if post is None or not post.image:
+            return True
+        build(post.image)
+        refresh_cards(Post.objects.filter(pk=post_id))
+        return True
+    except Exception:
+        logger.exception('Не удалось построить миниатюры записи %s', post_id)
+        return False
+
+
+def refresh_cards(posts):
+    """Обновляет карточки записей posts после построения миниатюр.
+
+    Карточка с исходной картинкой лежит в кэше под старой версией,
+    а страницы с ней - под старыми версиями областей.
+    """
+    pks = list(posts.values_list('pk', flat=True))
+    Post.objects.filter(pk__in=pks).bump()
+    freshness.touch(*{scope for pk in pks for scope in freshness.post_scopes(pk)})
+
+
+def finish(tasks, results):
+    """Убирает из очереди выполненные задачи, неудачным прибавляет попытку.
+
+    tasks - пары (id задачи, имя картинки), results - ответы build_post.
+    Задача удаляется, только если картинка с тех пор не менялась.
+    """
+    failed = []
+    for (pk, image), built in zip(tasks, results):
+        if built:
+            ThumbnailTask.objects.filter(pk=pk, image=image).delete()
+        else:
+            failed.append(pk)
+    ThumbnailTask.objects.filter(pk__in=failed).update(attempts=F('attempts') + 1)
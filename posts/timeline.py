@@ -0,0 +1,126 @@
+"""Лента подписок: чтение через JOIN или из заранее разложенных записей.
+
+Стратегия выбирается настройкой FOLLOW_FEED_STRATEGY:
+
+* 'join' - лента собирается при чтении запросом по таблице подписок;
+* 'fanout' - при публикации запись раскладывается по лентам всех
+  подписчиков (TimelineEntry), и чтение ленты - это проход по индексу
+  (user, pub_date) одного пользователя;
+* 'hybrid' - как 'fanout', но записи авторов, у которых подписчиков
+  больше FOLLOW_FEED_CELEBRITY_FOLLOWERS, не раскладываются, а
+  подмешиваются при чтении. Так публикация у популярного автора не
+  пишет миллион строк, а чтение добавляет лишь подписки на таких авторов.
+  Гибридная лента ограничена FOLLOW_FEED_HYBRID_DEPTH последними записями:
+  из разложенной ленты и у каждой знаменитости берётся не больше этого
+  числа записей по индексу (UNION ALL ограниченных подзапросов), и
+  страница выбирается только среди них. Так стоимость чтения не растёт
+  с размером ленты и числом записей у знаменитостей.
+
+Если автор перестал быть "знаменитостью", его записи за это время
+в ленты не попали - их возвращает команда rebuild_timelines.
+"""
+from django.conf import settings
+from django.db.models import F
+
+from .models import Post, Follow, TimelineEntry, AuthorStats
+
+JOIN = 'join'
+FANOUT = 'fanout'
+HYBRID = 'hybrid'
+
+BATCH_SIZE = 500
+
+
+def fanout_enabled():
+    return settings.FOLLOW_FEED_STRATEGY in (FANOUT, HYBRID)
+
+
+def is_pulled(author_id):
+    """Записи автора подмешиваются при чтении, а не раскладываются."""
+    if settings.FOLLOW_FEED_STRATEGY != HYBRID:
+        return False
+    return AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.FOLLOW_FEED_CELEBRITY_FOLLOWERS).exists()
+
+
+def pulled_authors(user):
+    """Авторы из подписок user, чьи записи подмешиваются при чтении."""
+    followed = Follow.objects.filter(user=user).values('author_id')
+    return (AuthorStats.objects
+            .filter(user_id__in=followed,
+                    followers_count__gt=settings.FOLLOW_FEED_CELEBRITY_FOLLOWERS)
+            .values_list('user_id', flat=True))
+
+
+def push_post(post):
+    """Раскладывает новую запись по лентам подписчиков автора."""
+    if is_pulled(post.author_id):
+        return
+    followers = Follow.objects.filter(author_id=post.author_id).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post.pk, pub_date=post.pub_date)
+         for user_id in followers.iterator()),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика уже опубликованные записи автора."""
+    if is_pulled(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list('pk', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+         for pk, pub_date in posts.iterator()),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True)
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты подписчика записи автора, от которого он отписался."""
+    TimelineEntry.objects.filter(user_id=user_id, post__author_id=author_id).delete()
+
+
+def hybrid_post_ids(user):
+    """SQL и параметры подзапроса с id последних FOLLOW_FEED_HYBRID_DEPTH записей.
+
+    UNION ALL ограниченных источников: разложенная лента user и записи
+    каждой знаменитости из его подписок. Каждый источник читается по
+    своему индексу уже в порядке ленты и не дальше LIMIT, поэтому
+    сортируется не больше depth строк на источник.
+    """
+    depth = settings.FOLLOW_FEED_HYBRID_DEPTH
+    pushed_sql, pushed_params = (TimelineEntry.objects.filter(user=user)
+                                 .order_by('-pub_date', '-post_id')
+                                 .values_list('pub_date', 'post_id')[:depth].query.sql_with_params())
+    # SQL записей автора собирается один раз, у знаменитостей меняется только id
+    pulled_sql, _ = (Post.objects.filter(author_id=0)
+                     .order_by('-pub_date', '-id')
+                     .values_list('pub_date', 'id')[:depth].query.sql_with_params())
+    # ORM не допускает LIMIT в частях UNION на SQLite,
+    # а во вложенном SELECT он разрешён везде
+    parts = [f'SELECT * FROM ({pushed_sql}) pushed']
+    params = list(pushed_params)
+    for number, author_id in enumerate(pulled_authors(user)):
+        parts.append(f'SELECT * FROM ({pulled_sql}) pulled_{number}')
+        params.append(author_id)
+    sql = (f'SELECT post_id FROM ({" UNION ALL ".join(parts)}) feed '
+           f'ORDER BY pub_date DESC, post_id DESC LIMIT %s')
+    return sql, [*params, depth]
+
+
+def follow_feed(user):
+    """Записи авторов, на которых подписан user, в порядке ленты."""
+    posts = Post.objects.for_feed()
+    strategy = settings.FOLLOW_FEED_STRATEGY
+    if strategy == HYBRID:
+        sql, params = hybrid_post_ids(user)
+        # через extra: выражение в pk__in SQLite понял бы как скалярный подзапрос
+        return posts.extra(where=[f'{Post._meta.db_table}.id IN ({sql})'], params=params)
+    if strategy == FANOUT:
+        return (posts.filter(timeline_entries__user=user)
+                .order_by(F('timeline_entries__pub_date').desc(),
+                          F('timeline_entries__post_id').desc()))
+    # подзапрос вместо JOIN через auth_user: записи берутся по индексу (author, pub_date)
+    return posts.filter(author_id__in=Follow.objects.filter(user=user).values('author_id'))
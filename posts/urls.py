@@ -7,6 +7,8 @@ urlpatterns = [path('', views.index, name='index'),
                path('group/<slug:slug>/', views.group_posts, name='group_posts'),
                path('new/', views.new_post, name='new_post'),
                path('follow/', views.follow_index, name='follow_index'),
+               path('search/', views.search, name='search'),
+               path('export/', views.export_ndjson, name='export_ndjson'),
                path('<str:username>/', views.profile, name='profile'),
                path('<str:username>/follow/', views.profile_follow, name='profile_follow'),
                path('<str:username>/unfollow/', views.profile_unfollow, name='profile_unfollow'),
@@ -1,10 +1,16 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.core.paginator import Paginator
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.paginator import Paginator
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.utils.http import urlencode
 
-from .models import Post, Group, Follow
+from .models import Post, Group, Follow, AuthorStats
+from . import export, freshness, thumbnails, timeline
 from .forms import PostForm, CommentForm
+from .paginator import paginate, POSTS_PER_PAGE
+from .search import search_posts
 
 
 def page_not_found(request, exception=None):
@@ -22,41 +28,59 @@ def server_error(request):
     return render(request, 'misc/500.html', status=500)
 
 
+@freshness.conditional_page(lambda: [freshness.INDEX])
 def index(request):
-    post_list = Post.objects.all()
-    # Если порядок сортировки определен в классе Meta модели,
-    # запрос будет выглядить так:
-    # post_list = Post.objects.all()
-    # Показывать по 10 записей на странице.
-    paginator = Paginator(post_list, 10)
-
-    # Из URL извлекаем номер запрошенной страницы - это значение параметра page
-    page_number = request.GET.get('page')
-
-    # Получаем набор записей для страницы с запрошенным номером
-    page = paginator.get_page(page_number)
+    post_list = Post.objects.for_feed()
+    # Получаем набор записей для запрошенной страницы (?page= или ?cursor=)
+    paginator, page = paginate(request, post_list, scope=freshness.INDEX)
     return render(request, 'index.html', {'page': page, 'paginator': paginator})
 
 
+@freshness.conditional_page(lambda slug: [freshness.group(slug)])
 def group_posts(request, slug):
     # функция get_object_or_404 получает по заданным
     # критериям объект из базы данных
     # или возвращает сообщение об ошибке, если объект не найден
     group = get_object_or_404(Group, slug=slug)
 
-    post_list = group.posts.all()
-
-    paginator = Paginator(post_list, 10)
-
-    # Из URL извлекаем номер запрошенной страницы - это значение параметра page
-    page_number = request.GET.get('page')
-
-    # Получаем набор записей для страницы с запрошенным номером
-    page = paginator.get_page(page_number)
+    post_list = group.posts.for_feed()
+    paginator, page = paginate(request, post_list, scope=freshness.group(slug))
     context = {'group': group, 'page': page, 'paginator': paginator}
     return render(request, 'group.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    # Результаты идут по релевантности, а не по дате,
+    # поэтому страницы только по номеру, без курсора
+    paginator = Paginator(search_posts(query), POSTS_PER_PAGE)
+    page = paginator.get_page(request.GET.get('page'))
+    context = {'page': page,
+               'paginator': paginator,
+               'query': query,
+               'query_string': urlencode({'q': query})}
+    return render(request, 'search.html', context)
+
+
+@staff_member_required
+def export_ndjson(request):
+    # ?tables=post,comment - какие таблицы выгрузить, ?gzip=1 - сжать
+    try:
+        tables = export.parse_tables(request.GET.get('tables'))
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    chunks = export.ndjson(tables)
+    filename = 'yatube.ndjson'
+    content_type = 'application/x-ndjson'
+    if request.GET.get('gzip'):
+        chunks = export.gzipped(chunks)
+        filename += '.gz'
+        content_type = 'application/gzip'
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 @login_required
 def new_post(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -67,22 +91,25 @@ def new_post(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        thumbnails.schedule(post)
 
         return redirect('index')
     context = {'form': form, 'markup': markup}
     return render(request, 'posts/new_post.html', context)
 
 
+@freshness.conditional_page(lambda username: [freshness.profile(username)])
 def profile(request, username):
     author = User.objects.get(username=username)
-    post_list = author.posts.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    count = post_list.count()
-    follower_count = author.following.count()
+    post_list = author.posts.for_feed()
+    # Счётчики профиля читаем из AuthorStats, а не считаем каждый раз,
+    # число записей нужно и паджинатору
+    stats = AuthorStats.for_user(author)
+    count = stats.posts_count
+    paginator, page = paginate(request, post_list, scope=freshness.profile(username), count=count)
+    follower_count = stats.followers_count
     if request.user.is_authenticated:
-        following_count = author.follower.count()
+        following_count = stats.following_count
         following = Follow.objects.filter(user=request.user, author=author).exists()
     else:
         following_count = None
@@ -100,16 +127,19 @@ def profile(request, username):
     return render(request, 'profile.html', context)
 
 
+@freshness.conditional_page(
+    lambda username, post_id: [freshness.profile(username), freshness.post(post_id)])
 def post_view(request, username, post_id):
     author = User.objects.get(username=username)
-    post = get_object_or_404(Post, author=author, pk=post_id)
-    count = Post.objects.filter(author=author).count()
+    post = get_object_or_404(Post.objects.for_feed(), author=author, pk=post_id)
+    stats = AuthorStats.for_user(author)
+    count = stats.posts_count
     author_user = request.user.username
     comments = post.сomments.all()
     form = CommentForm()
-    follower_count = author.following.count()
+    follower_count = stats.followers_count
     if request.user.is_authenticated:
-        following_count = author.follower.count()
+        following_count = stats.following_count
         following = Follow.objects.filter(user=request.user, author=author).exists()
     else:
         following_count = None
@@ -142,9 +172,12 @@ def post_edit(request, username, post_id):
                    'markup': markup}
         return render(request, 'posts/new_post.html', context)
     if request.method == 'POST' and form.is_valid():
-        post.group = form.cleaned_data['group']
-        post.text = form.cleaned_data['text']
-        post.save()
+        post = form.save(commit=False)
+        # сохраняем только поля формы: comment_count и version меняются
+        # сигналами, их не перезаписываем
+        post.save(update_fields=[*PostForm._meta.fields, 'image_width', 'image_height'])
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post)
         return redirect('post', username, post_id)
     else:
         return redirect('post', username, post_id)
@@ -164,10 +197,8 @@ def add_comment(request, username, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = timeline.follow_feed(request.user)
+    paginator, page = paginate(request, post_list)
     return render(request, 'follow.html', {'page': page, 'paginator': paginator})
 
 
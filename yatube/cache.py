@@ -0,0 +1,185 @@
+"""Кэш в файле SQLite, общий для всех процессов на одном сервере.
+
+LocMemCache у каждого воркера свой, поэтому после перезапуска все
+воркеры по очереди прогревают одни и те же ключи. Здесь записи лежат
+в одном файле SQLite (в режиме WAL читатели не мешают писателю),
+а при превышении MAX_ENTRIES или MAX_SIZE (в байтах) вытесняются
+давно не читавшиеся ключи (LRU).
+
+Подключение в settings.CACHES:
+
+    'BACKEND': 'yatube.cache.SQLiteCache',
+    'LOCATION': '/var/tmp/yatube-cache.sqlite3',
+    'OPTIONS': {'MAX_ENTRIES': 10000, 'MAX_SIZE': 64 * 1024 * 1024},
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Время последнего чтения обновляется не чаще раза в секунду,
+# чтобы горячие ключи не превращали каждое чтение в запись
+ACCESS_RESOLUTION = 1.0
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL,'
+    ' accessed REAL NOT NULL, size INTEGER NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    # Число записей и общий размер ведут триггеры, чтобы проверка
+    # лимитов после каждой записи не сканировала всю таблицу
+    'CREATE TABLE IF NOT EXISTS cache_totals ('
+    ' id INTEGER PRIMARY KEY CHECK (id = 1),'
+    ' entries INTEGER NOT NULL, size INTEGER NOT NULL)',
+    'INSERT OR IGNORE INTO cache_totals VALUES (1, 0, 0)',
+    'CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN'
+    ' UPDATE cache_totals SET entries = entries + 1, size = size + NEW.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN'
+    ' UPDATE cache_totals SET entries = entries - 1, size = size - OLD.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size ON cache BEGIN'
+    ' UPDATE cache_totals SET size = size - OLD.size + NEW.size; END',
+)
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        options = params.get('OPTIONS', {})
+        self._max_size = int(options.get('MAX_SIZE', 0))
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = threading.local()
+
+    def _connection(self):
+        # Соединение своё у каждого потока и заново открывается после fork
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self._path, timeout=self._busy_timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            with connection:
+                for statement in SCHEMA:
+                    connection.execute(statement)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        connection = self._connection()
+        row = connection.execute(
+            'SELECT value, expires, accessed FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return default
+        value, expires, accessed = row
+        now = time.time()
+        if expires is not None and expires <= now:
+            connection.execute('DELETE FROM cache WHERE key = ? AND expires <= ?', (key, now))
+            return default
+        if now - accessed > ACCESS_RESOLUTION:
+            connection.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+        return pickle.loads(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._store(key, value, timeout, only_new=False)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._store(key, value, timeout, only_new=True)
+
+    def _store(self, key, value, timeout, only_new):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if self._max_size and len(data) > self._max_size:
+            return False
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            if only_new:
+                # add() может занять ключ, только если он свободен или истёк
+                connection.execute('DELETE FROM cache WHERE key = ? AND expires <= ?', (key, now))
+                cursor = connection.execute(
+                    'INSERT OR IGNORE INTO cache (key, value, expires, accessed, size) '
+                    'VALUES (?, ?, ?, ?, ?)', (key, data, expires, now, len(data)))
+                if not cursor.rowcount:
+                    return False
+            else:
+                connection.execute(
+                    'INSERT INTO cache (key, value, expires, accessed, size) VALUES (?, ?, ?, ?, ?) '
+                    'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires, '
+                    'accessed = excluded.accessed, size = excluded.size',
+                    (key, data, expires, now, len(data)))
+            self._cull(connection, now)
+        return True
+
+    def _cull(self, connection, now):
+        entries, size = connection.execute('SELECT entries, size FROM cache_totals').fetchone()
+        if entries <= self._max_entries and (not self._max_size or size <= self._max_size):
+            return
+        connection.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        # Вытесняем давно не читавшиеся ключи порциями, как делает
+        # LocMemCache: по 1/CULL_FREQUENCY записей за раз
+        while True:
+            entries, size = connection.execute('SELECT entries, size FROM cache_totals').fetchone()
+            if entries <= self._max_entries and (not self._max_size or size <= self._max_size):
+                return
+            if self._cull_frequency == 0:
+                connection.execute('DELETE FROM cache')
+                return
+            connection.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (max(1, entries // self._cull_frequency),))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        now = time.time()
+        cursor = self._connection().execute(
+            'UPDATE cache SET expires = ?, accessed = ? '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), now, key, now))
+        return bool(cursor.rowcount)
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        connection = self._connection()
+        # Чтение и запись в одной транзакции, чтобы процессы не теряли приращения
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute(
+                'SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (key, time.time())).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            connection.execute('UPDATE cache SET value = ?, size = ? WHERE key = ?', (data, len(data), key))
+        return value
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._connection().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        row = self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time())).fetchone()
+        return row is not None
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
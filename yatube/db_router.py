@@ -0,0 +1,74 @@
+"""Чтение с реплики, запись - в основную базу.
+
+Реплика подключается переменной окружения DATABASE_REPLICA (путь
+к копии файла SQLite, которую обновляет внешняя репликация) и
+появляется в settings.DATABASES под именем 'replica'. Без неё
+роутер всё отправляет в 'default'.
+
+Реплика отстаёт от основной базы, поэтому чтение переключается
+на основную базу:
+- до конца запроса (или команды), как только в нём была запись;
+- для небезопасных методов (POST и т.п.) с самого начала запроса;
+- на REPLICA_PIN_SECONDS после запроса с записью: PinPrimaryMiddleware
+  ставит пользователю куку, и он сразу видит свои изменения.
+"""
+import contextvars
+import time
+
+from django.conf import settings
+
+REPLICA = 'replica'
+PRIMARY = 'default'
+PIN_COOKIE = 'pin_primary'
+
+# Читать из основной базы в текущем запросе
+pinned = contextvars.ContextVar('pinned', default=False)
+# В текущем запросе была запись
+wrote = contextvars.ContextVar('wrote', default=False)
+
+
+def replica_enabled():
+    return REPLICA in settings.DATABASES
+
+
+def recently_changed(timestamp):
+    """Изменение в timestamp могло ещё не дойти до реплики."""
+    return replica_enabled() and time.time() - timestamp < settings.REPLICA_PIN_SECONDS
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (not replica_enabled() or pinned.get() or wrote.get()
+                or model._meta.app_label not in settings.REPLICA_APPS):
+            return PRIMARY
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        wrote.set(True)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # на реплике те же данные, что и в основной базе
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # схема приходит на реплику вместе с данными
+        return db != REPLICA
+
+
+class PinPrimaryMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned_token = pinned.set(PIN_COOKIE in request.COOKIES or request.method not in ('GET', 'HEAD'))
+        wrote_token = wrote.set(False)
+        try:
+            response = self.get_response(request)
+            if wrote.get() and replica_enabled():
+                response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                                    httponly=True, samesite='Lax')
+            return response
+        finally:
+            pinned.reset(pinned_token)
+            wrote.reset(wrote_token)
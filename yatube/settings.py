@@ -50,6 +50,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'yatube.db_router.PinPrimaryMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -84,13 +85,34 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# yatube.sqlite_backend - SQLite в режиме WAL, с busy timeout и
+# BEGIN IMMEDIATE для транзакций, см. yatube/sqlite_backend/base.py.
+# Соединение живёт DB_CONN_MAX_AGE секунд и переиспользуется запросами
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'yatube.sqlite_backend',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'OPTIONS': {
+            'timeout': 20,
+        },
     }
 }
 
+# Реплика для чтения лент: копия базы, которую обновляет внешняя
+# репликация (например, litestream). См. yatube/db_router.py
+if os.environ.get('DATABASE_REPLICA'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['DATABASE_REPLICA'],
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['yatube.db_router.PrimaryReplicaRouter']
+# Приложения, чьи модели читаются с реплики (сессии - всегда из основной базы)
+REPLICA_APPS = ('posts', 'auth')
+# Сколько секунд после записи пользователь читает из основной базы
+REPLICA_PIN_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -149,9 +171,46 @@ EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
-# для кэширования данных
+# для кэширования данных: бэкенд выбирается переменной окружения CACHE_BACKEND
+# locmem - память процесса, у каждого воркера свой кэш (по умолчанию);
+# file - файлы в каталоге CACHE_LOCATION;
+# sqlite - один файл SQLite на сервер, общий для всех воркеров,
+# с вытеснением давно не читавшихся ключей (см. yatube/cache.py)
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', ''),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache',
+             os.path.join(BASE_DIR, 'cache')),
+    'sqlite': ('yatube.cache.SQLiteCache',
+               os.path.join(BASE_DIR, 'cache.sqlite3')),
+}
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS[os.environ.get('CACHE_BACKEND', 'locmem')]
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('CACHE_LOCATION', CACHE_LOCATION),
+        'TIMEOUT': int(os.environ.get('CACHE_TIMEOUT', 300)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 10000)),
+            # ограничение по объёму в байтах, учитывает только sqlite
+            'MAX_SIZE': int(os.environ.get('CACHE_MAX_SIZE', 64 * 1024 * 1024)),
+        },
     }
 }
+
+# Лента подписок: 'join' - собирается при чтении,
+# 'fanout' - раскладывается по лентам подписчиков при публикации,
+# 'hybrid' - раскладывается, кроме записей авторов, у которых подписчиков
+# больше FOLLOW_FEED_CELEBRITY_FOLLOWERS: их записи подмешиваются при чтении
+# (после включения заполнить ленты командой rebuild_timelines)
+FOLLOW_FEED_STRATEGY = 'join'
+FOLLOW_FEED_CELEBRITY_FOLLOWERS = 1000
+# сколько последних записей можно пролистать в гибридной ленте
+FOLLOW_FEED_HYBRID_DEPTH = 1000
+
+# Сколько секунд обратный прокси может отдавать страницы лент
+# анонимным пользователям без перепроверки (Cache-Control: s-maxage)
+FEED_PROXY_MAX_AGE = 10
+# Сколько секунд хранить в кэше готовые страницы для анонимных
+# пользователей; устаревшие страницы вытесняются и раньше, см. posts/freshness.py
+PAGE_CACHE_TIMEOUT = 600
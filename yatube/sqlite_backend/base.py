@@ -0,0 +1,58 @@
+"""Бэкенд SQLite с настройками для работы под нагрузкой.
+
+Обычный django.db.backends.sqlite3 открывает файл в режиме журнала
+DELETE: пока один процесс пишет, остальные не могут даже читать,
+а транзакция, начатая чтением, при попытке записи сразу получает
+"database is locked" - ожидание busy timeout в этом случае не
+помогает. Здесь при открытии соединения включаются WAL (читатели не
+ждут писателя), synchronous=NORMAL, mmap и кэш страниц, а транзакции
+atomic() начинаются с BEGIN IMMEDIATE, то есть сразу встают в
+очередь на запись и ждут её не дольше timeout.
+
+Подключение в settings.DATABASES:
+
+    'ENGINE': 'yatube.sqlite_backend',
+    'CONN_MAX_AGE': 60,
+    'OPTIONS': {
+        'timeout': 20,
+        'transaction_mode': 'IMMEDIATE',
+        'pragmas': {'mmap_size': 256 * 1024 * 1024},
+    },
+"""
+from django.db.backends.sqlite3 import base
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    # 256 МБ файла читаются через mmap, без копирования в память процесса
+    'mmap_size': 256 * 1024 * 1024,
+    # отрицательное значение - размер в КиБ: 64 МБ кэша страниц
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        # наши параметры не передаются в sqlite3.connect()
+        params.pop('pragmas', None)
+        params.pop('transaction_mode', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        pragmas = {**PRAGMAS, **self.settings_dict['OPTIONS'].get('pragmas', {})}
+        # busy_timeout в миллисекундах, timeout из OPTIONS - в секундах
+        pragmas.setdefault('busy_timeout', int(conn_params.get('timeout', 5) * 1000))
+        for name, value in pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode', 'IMMEDIATE').upper()
+        if mode not in TRANSACTION_MODES:
+            mode = 'DEFERRED'
+        self.cursor().execute(f'BEGIN {mode}')
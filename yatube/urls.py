@@ -18,6 +18,9 @@ urlpatterns = [
     #  раздел администратора
     path('admin/', admin.site.urls),
 
+    #  JSON API лент и записей, только чтение
+    path('api/v1/', include('posts.api_urls')),
+
     #  обработчик для главной страницы ищем в urls.py приложения posts
     path('', include('posts.urls')),
 